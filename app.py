@@ -1,14 +1,25 @@
 import streamlit as st
 import google.genai as genai
 from google.genai import types
+from google.genai import errors as genai_errors
 import json
 import random
 import io
+import mimetypes
 import os
 import re
 import secrets
+import tempfile
+import time
 import hashlib
+import hmac
+import threading
+from collections import OrderedDict, defaultdict
+import functools
+import itertools
 import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from PyPDF2 import PdfReader
 from streamlit_agraph import agraph, Node, Edge, Config
 from datetime import datetime
@@ -109,7 +120,8 @@ def init_db():
                 ALTER TABLE results
                     ADD COLUMN IF NOT EXISTS exemplary_response TEXT,
                     ADD COLUMN IF NOT EXISTS exemplary_feedback TEXT,
-                    ADD COLUMN IF NOT EXISTS exemplary_refined TEXT;
+                    ADD COLUMN IF NOT EXISTS exemplary_refined TEXT,
+                    ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER;
             """)
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS sop_chunks (
@@ -139,38 +151,61 @@ KNOWLEDGE_BASE_FILE = "HRLKnowledgeBase"
 WEBSITE_KB_FILE = "und_housing_website.md"
 BEST_PRACTICES_FILE = "housing_best_practices.md"
 CONFIG_FILE = "config.json"
+REVIEW_PAGE_SIZE = 20
+RESULTS_DEFAULT_LIMIT = 200
 
 # --- UND Housing Context for Realistic Scenarios ---
 # UND_HOUSING_CONTEXT removed — content now lives in HRL Knowledge Base (loaded fresh via load_knowledge_base())
 
 # --- Password Security Functions ---
+PASSWORD_HASH_METHOD = "scrypt"
+# Legacy "salt$hex" hashes; hashlib.pbkdf2_hmac is OpenSSL-backed, which precomputes the HMAC pads once per call
+LEGACY_PBKDF2_ITERATIONS = 100000
+
 def hash_password(password):
-    """Hash a password with a salt for secure storage."""
-    salt = secrets.token_hex(16)
-    hashed = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-    return f"{salt}${hashed.hex()}"
+    """Hash a password with a salt for secure storage (memory-hard scrypt via werkzeug)."""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
 
 def verify_password(stored_hash, password):
-    """Verify a password against its stored hash."""
+    """Verify a password against its stored hash.
+    Accepts werkzeug hashes ("method$salt$hash") and the legacy "salt$hex" PBKDF2 format."""
     try:
-        salt, hash_hex = stored_hash.split('$')
-        hashed = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-        return hashed.hex() == hash_hex
+        if stored_hash.count('$') == 1:
+            salt, hash_hex = stored_hash.split('$')
+            hashed = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), LEGACY_PBKDF2_ITERATIONS)
+            return hmac.compare_digest(hashed, bytes.fromhex(hash_hex))
+        return check_password_hash(stored_hash, password)
     except (ValueError, AttributeError):
         return False
 
+def password_needs_rehash(stored_hash):
+    """True if the stored hash predates the current hashing method and should be upgraded on login."""
+    return not str(stored_hash or "").startswith(f"{PASSWORD_HASH_METHOD}:")
+
+_OVERALL_SCORE_RE = re.compile(r"OVERALL_SCORE[ \t]*:[ \t]*([1-4])")
+_OVERALL_SCORE_LINE_RE = re.compile(r"^OVERALL_SCORE\s*:\s*([1-4])\b", re.MULTILINE)
+# Call analyses: the value after "Overall Score:" up to the next colon or line end
+_CALL_SCORE_RE = re.compile(r"Overall Score:([^:\n]*)")
+_LINE_ENDING_RE = re.compile(r"\r\n?")
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+POLISH_CACHE_SIZE = 50
+
+def normalize_polish_text(text):
+    """Key for the Tone Polisher's per-session cache: ignores line-ending style and leading/trailing
+    whitespace, but keeps case and paragraph breaks since the revision depends on them."""
+    return _LINE_ENDING_RE.sub("\n", text).strip()
+
 def validate_email(email):
     """Basic email validation."""
-    import re
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
-def load_users():
-    """Loads all users from the database."""
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_users():
+    """Reads all users from the database. Raises on database errors so failures are not cached."""
     db_pool = get_db_pool()
     if not db_pool:
-        st.error("Database connection is not available.")
-        return {}
+        raise RuntimeError("Database connection is not available.")
     conn = None
     try:
         conn = db_pool.getconn()
@@ -187,13 +222,30 @@ def load_users():
                     "position": pos
                 }
             return users
-    except Exception as e:
-        st.error(f"Error loading users from database: {e}")
-        return {}
     finally:
         if conn:
             db_pool.putconn(conn)
 
+def load_users():
+    """Loads all users; cached between reruns and cleared whenever users are saved or deleted."""
+    try:
+        return _fetch_users()
+    except Exception as e:
+        st.error(f"Error loading users from database: {e}")
+        return {}
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def user_email_index():
+    """Frozen set of lowercased registered emails for case-insensitive existence checks.
+
+    Raises on database errors (like _fetch_users) so a failed lookup is never cached.
+    """
+    return frozenset(email.lower() for email in _fetch_users())
+
+def _invalidate_users_cache():
+    _fetch_users.clear()
+    user_email_index.clear()
+
 def save_user(email, password, is_admin=False, first_name="", last_name="", position=""):
     """Saves or updates a single user in the database."""
     db_pool = get_db_pool()
@@ -201,7 +253,7 @@ def save_user(email, password, is_admin=False, first_name="", last_name="", posi
         st.error("Database connection is not available.")
         return
     conn = None
-    password_hash = generate_password_hash(password)
+    password_hash = hash_password(password)
     try:
         conn = db_pool.getconn()
         with conn.cursor() as cur:
@@ -219,6 +271,7 @@ def save_user(email, password, is_admin=False, first_name="", last_name="", posi
                 (email, password_hash, is_admin, first_name, last_name, position)
             )
             conn.commit()
+        _invalidate_users_cache()
     except Exception as e:
         st.error(f"Error saving user to database: {e}")
         if conn:
@@ -239,7 +292,8 @@ def delete_user(email):
         with conn.cursor() as cur:
             cur.execute("DELETE FROM users WHERE email = %s", (email,))
             conn.commit()
-            return True
+        _invalidate_users_cache()
+        return True
     except Exception as e:
         st.error(f"Error deleting user from database: {e}")
         if conn:
@@ -249,76 +303,125 @@ def delete_user(email):
         if conn:
             db_pool.putconn(conn)
 
-def load_framework():
-    """Loads the Guiding North Framework from the markdown file."""
+@st.cache_resource(ttl=30, show_spinner=False)
+def _data_file_mtimes():
+    """Stats the bundled data files in one pass, at most every 30 seconds per process."""
+    mtimes = {}
+    for path in (FRAMEWORK_FILE, KNOWLEDGE_BASE_FILE, WEBSITE_KB_FILE, BEST_PRACTICES_FILE):
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except OSError:
+            pass
+    return mtimes
+
+def _file_mtime(path):
+    """Returns the file's modification time, or None if it does not exist."""
+    return _data_file_mtimes().get(path)
+
+def _atomic_write_text(path, text):
+    """Writes text to a temp file beside `path` and renames it into place, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp_")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        _data_file_mtimes.clear()
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+# Four files go through here; a small bound keeps at most one superseded copy of each after a rewrite
+@st.cache_data(max_entries=8, show_spinner=False)
+def _read_text_file(path, mtime):
+    """Reads a text file once per modification time; returns None if it is missing."""
+    if mtime is None:
+        return None
     try:
-        with open(FRAMEWORK_FILE, 'r', encoding='utf-8', errors='replace') as f:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
             return f.read()
     except FileNotFoundError:
+        return None
+
+def load_framework():
+    """Loads the Guiding North Framework from the markdown file."""
+    content = _read_text_file(FRAMEWORK_FILE, _file_mtime(FRAMEWORK_FILE))
+    if content is None:
         st.error(f"Framework file not found: {FRAMEWORK_FILE}")
         return "Framework not available."
+    return content
 
-def load_knowledge_base():
-    """Loads the HRL Knowledge Base — checks DB first, falls back to file.
-    If DB content is missing structural markers, reseeds from file automatically."""
-    _file_content = None
-    def _read_file():
-        try:
-            with open(KNOWLEDGE_BASE_FILE, 'r', encoding='utf-8', errors='replace') as f:
-                return f.read()
-        except FileNotFoundError:
-            return None
+def _read_knowledge_base_file():
+    """The knowledge base file's text (None if missing)."""
+    return _read_text_file(KNOWLEDGE_BASE_FILE, _file_mtime(KNOWLEDGE_BASE_FILE))
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_knowledge_base():
+    """Reads the HRL Knowledge Base from the DB (None if no row is stored).
+    If DB content is missing structural markers, reseeds from file automatically.
+    Raises on database errors so failures are not cached; save_knowledge_base() clears the cache."""
     db_pool = get_db_pool()
-    if db_pool:
-        conn = None
-        try:
-            conn = db_pool.getconn()
-            with conn.cursor() as cur:
-                cur.execute("SELECT value FROM app_config WHERE key = 'hrl_knowledge_base'")
-                row = cur.fetchone()
-                if row and row[0]:
-                    val = row[0]
-                    if isinstance(val, dict):
-                        db_content = val.get('content', '')
-                    else:
-                        try:
-                            db_content = json.loads(val).get('content', '')
-                        except Exception:
-                            db_content = str(val)
-                    # If DB content is missing markers OR is behind the file's version, reseed from file
-                    _file_content = _read_file()
-                    _db_version = ''
-                    _file_version = ''
-                    import re as _re
-                    _db_ver_match = _re.search(r'===KB_VERSION:\s*([\w]+)===', db_content)
-                    if _db_ver_match:
-                        _db_version = _db_ver_match.group(1)
-                    if _file_content:
-                        _file_ver_match = _re.search(r'===KB_VERSION:\s*([\w]+)===', _file_content)
-                        if _file_ver_match:
-                            _file_version = _file_ver_match.group(1)
-                    _needs_reseed = (
-                        '===FEES_START===' not in db_content or
-                        '===ROLE_START:' not in db_content or
-                        (_file_version and _db_version != _file_version)
-                    )
-                    if _needs_reseed:
-                        if _file_content and ('===FEES_START===' in _file_content or '===ROLE_START:' in _file_content):
-                            cur.execute("""
-                                INSERT INTO app_config (key, value) VALUES ('hrl_knowledge_base', %s)
-                                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
-                            """, (json.dumps({"content": _file_content}),))
-                            conn.commit()
-                            return _file_content
-                    return db_content
-        except Exception:
-            pass
-        finally:
-            if conn:
-                db_pool.putconn(conn)
-    # Fall back to file
-    return _file_content or _read_file() or "Knowledge base not available."
+    if not db_pool:
+        raise RuntimeError("Database connection is not available.")
+    conn = None
+    try:
+        conn = db_pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute("SELECT value FROM app_config WHERE key = 'hrl_knowledge_base'")
+            row = cur.fetchone()
+            if row and row[0]:
+                val = row[0]
+                if isinstance(val, dict):
+                    db_content = val.get('content', '')
+                else:
+                    try:
+                        db_content = json.loads(val).get('content', '')
+                    except Exception:
+                        db_content = str(val)
+                # If DB content is missing markers OR is behind the file's version, reseed from file
+                _file_content = _read_knowledge_base_file()
+                _db_version = ''
+                _file_version = ''
+                import re as _re
+                _db_ver_match = _re.search(r'===KB_VERSION:\s*([\w]+)===', db_content)
+                if _db_ver_match:
+                    _db_version = _db_ver_match.group(1)
+                if _file_content:
+                    _file_ver_match = _re.search(r'===KB_VERSION:\s*([\w]+)===', _file_content)
+                    if _file_ver_match:
+                        _file_version = _file_ver_match.group(1)
+                _needs_reseed = (
+                    '===FEES_START===' not in db_content or
+                    '===ROLE_START:' not in db_content or
+                    (_file_version and _db_version != _file_version)
+                )
+                if _needs_reseed:
+                    if _file_content and ('===FEES_START===' in _file_content or '===ROLE_START:' in _file_content):
+                        cur.execute("""
+                            INSERT INTO app_config (key, value) VALUES ('hrl_knowledge_base', %s)
+                            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+                        """, (json.dumps({"content": _file_content}),))
+                        conn.commit()
+                        return _file_content
+                return db_content
+            return None
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            db_pool.putconn(conn)
+
+def load_knowledge_base():
+    """Loads the HRL Knowledge Base — checks DB first, falls back to file."""
+    try:
+        content = _fetch_knowledge_base()
+    except Exception:
+        content = None
+    return content or _read_knowledge_base_file() or "Knowledge base not available."
 
 def save_knowledge_base(content):
     """Saves the HRL Knowledge Base to the database."""
@@ -334,6 +437,7 @@ def save_knowledge_base(content):
                 ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
             """, (json.dumps({"content": content}),))
         conn.commit()
+        _fetch_knowledge_base.clear()
         return True
     except Exception as e:
         st.error(f"Failed to save Knowledge Base: {e}")
@@ -344,21 +448,19 @@ def save_knowledge_base(content):
 
 def load_website_kb():
     """Loads UND Housing website notes for public info and links."""
-    try:
-        with open(WEBSITE_KB_FILE, 'r', encoding='utf-8', errors='replace') as f:
-            return f.read()
-    except FileNotFoundError:
+    content = _read_text_file(WEBSITE_KB_FILE, _file_mtime(WEBSITE_KB_FILE))
+    if content is None:
         st.error(f"Website notes file not found: {WEBSITE_KB_FILE}")
         return "Website notes not available."
+    return content
 
 def load_best_practices():
     """Loads general housing best practices."""
-    try:
-        with open(BEST_PRACTICES_FILE, 'r', encoding='utf-8', errors='replace') as f:
-            return f.read()
-    except FileNotFoundError:
+    content = _read_text_file(BEST_PRACTICES_FILE, _file_mtime(BEST_PRACTICES_FILE))
+    if content is None:
         st.error(f"Best practices file not found: {BEST_PRACTICES_FILE}")
         return "Best practices not available."
+    return content
 
 def extract_exemplary_response(evaluation_text):
     """Extracts the Exemplary Response / Call Example section from an AI evaluation."""
@@ -378,6 +480,18 @@ def extract_exemplary_response(evaluation_text):
     return None
 
 
+_REVIEW_FMT = "%B %d, %Y at %I:%M %p"
+
+
+@functools.lru_cache(maxsize=4096)
+def format_review_date(iso):
+    """Formats an ISO review timestamp for display; unparseable values are returned unchanged."""
+    try:
+        return datetime.fromisoformat(iso.replace("Z", "+00:00")).strftime(_REVIEW_FMT)
+    except (AttributeError, TypeError, ValueError):
+        return iso
+
+
 def build_review_printout(data: dict) -> str:
     """Build a print-ready HTML document for a scenario review session.
 
@@ -467,16 +581,43 @@ def build_review_printout(data: dict) -> str:
 </html>"""
 
 
-def load_results():
-    """Loads all results from the database."""
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_results(status=None, limit=None, viewer_email=None, report_roles=(), completed_only=False):
+    """Reads results newest first; cached per argument set and cleared by every results write.
+    Raises on database errors so failures are not cached."""
     db_pool = get_db_pool()
     if not db_pool:
-        return []
+        raise RuntimeError("Database connection is not available.")
     conn = None
     try:
         conn = db_pool.getconn()
         with conn.cursor() as cur:
-            cur.execute("SELECT id, first_name, last_name, email, timestamp, role, difficulty, scenario, user_response, evaluation, overall_score, status, reviewed_by, review_date, supervisor_notes, exemplary_response, exemplary_feedback, exemplary_refined FROM results ORDER BY timestamp DESC")
+            query = "SELECT id, first_name, last_name, email, timestamp, role, difficulty, scenario, user_response, evaluation, overall_score, status, reviewed_by, review_date, supervisor_notes, exemplary_response, exemplary_feedback, exemplary_refined, prompt_tokens FROM results"
+            conditions, params = [], []
+            if status is not None:
+                conditions.append("status = %s")
+                params.append(status)
+            if completed_only:
+                conditions.append("status IS DISTINCT FROM 'pending'")
+            if viewer_email is not None:
+                # The viewer's own rows, plus every row by anyone with a completed result in a direct-report role
+                if report_roles:
+                    conditions.append(
+                        "(email = %s OR email IN (SELECT email FROM results"
+                        " WHERE role = ANY(%s) AND status IS DISTINCT FROM 'pending'))"
+                    )
+                    params.extend([viewer_email, list(report_roles)])
+                else:
+                    conditions.append("email = %s")
+                    params.append(viewer_email)
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            # Filters come before LIMIT so the cap applies to the rows this viewer can actually see
+            query += " ORDER BY timestamp DESC"
+            if limit is not None:
+                query += " LIMIT %s"
+                params.append(limit)
+            cur.execute(query, params)
             results = []
             for record in cur.fetchall():
                 results.append({
@@ -498,28 +639,59 @@ def load_results():
                     "exemplary_response": record[15],
                     "exemplary_feedback": record[16],
                     "exemplary_refined": record[17],
+                    "prompt_tokens": record[18],
                 })
             return results
-    except Exception as e:
-        st.error(f"Error loading results from database: {e}")
-        return []
     finally:
         if conn:
             db_pool.putconn(conn)
 
-def save_results(data):
-    """Saves a single result dict to the database."""
+def load_results(status=None, limit=None, viewer_email=None, report_roles=(), completed_only=False):
+    """Loads results from the database, newest first; pass `status` to filter server-side (e.g. 'pending')
+    and `limit` to fetch only the most recent rows. `viewer_email` (with a supervisor's `report_roles`)
+    restricts the rows to what that viewer may see, so a limit never cuts their history for other users' rows."""
+    try:
+        return _fetch_results(status, limit, viewer_email, tuple(report_roles), completed_only)
+    except Exception as e:
+        st.error(f"Error loading results from database: {e}")
+        return []
+
+@st.cache_resource
+def get_background_executor():
+    """Process-wide worker pool for database writes that should not block the script thread."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="guiding-north-bg")
+
+def check_background_saves(state_key, error_prefix="Error saving result to database"):
+    """Reports every failed background save in the list at st.session_state[state_key].
+
+    Finished futures are dropped from the list; pending ones are kept for a later rerun.
+    """
+    futures = st.session_state.get(state_key)
+    if not futures:
+        return
+    pending = []
+    for future in futures:
+        if not future.done():
+            pending.append(future)
+            continue
+        exc = future.exception()
+        if exc is not None:
+            st.error(f"{error_prefix}: {exc}")
+    st.session_state[state_key] = pending
+
+def _insert_result(data):
+    """Inserts a single result row; raises on failure. Safe to run off the script thread (no st.* calls)."""
     db_pool = get_db_pool()
     if not db_pool:
-        return False
+        raise RuntimeError("Database connection is not available.")
     conn = None
     try:
         conn = db_pool.getconn()
         with conn.cursor() as cur:
             cur.execute(
                 """
-                INSERT INTO results (first_name, last_name, email, timestamp, role, difficulty, scenario, user_response, evaluation, overall_score, status, exemplary_response)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+                INSERT INTO results (first_name, last_name, email, timestamp, role, difficulty, scenario, user_response, evaluation, overall_score, status, exemplary_response, prompt_tokens)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
                 """,
                 (
                     data.get("first_name"), data.get("last_name"), data.get("email"),
@@ -527,20 +699,33 @@ def save_results(data):
                     data.get("scenario"), data.get("user_response"),
                     data.get("evaluation"), data.get("overall_score"),
                     data.get("status", "pending"),
-                    data.get("exemplary_response")
+                    data.get("exemplary_response"),
+                    data.get("prompt_tokens")
                 )
             )
             conn.commit()
-            return True
-    except Exception as e:
-        st.error(f"Error saving result to database: {e}")
+        _fetch_results.clear()
+        return True
+    except Exception:
         if conn:
             conn.rollback()
-        return False
+        raise
     finally:
         if conn:
             db_pool.putconn(conn)
 
+def save_results(data):
+    """Appends a single result dict to the database (one-row INSERT; existing results are never rewritten)."""
+    try:
+        return _insert_result(data)
+    except Exception as e:
+        st.error(f"Error saving result to database: {e}")
+        return False
+
+def save_results_in_background(data):
+    """Queues the result insert on the background pool and returns its Future."""
+    return get_background_executor().submit(_insert_result, dict(data))
+
 def update_result(result_id, **fields):
     """Updates specific fields of an existing result row by id."""
     db_pool = get_db_pool()
@@ -565,6 +750,7 @@ def update_result(result_id, **fields):
             values = list(safe_fields.values()) + [result_id]
             cur.execute(f"UPDATE results SET {set_clause} WHERE id = %s", values)
             conn.commit()
+            _fetch_results.clear()
             return True
     except Exception as e:
         st.error(f"Error updating result: {e}")
@@ -586,6 +772,7 @@ def delete_result(result_id):
         with conn.cursor() as cur:
             cur.execute("DELETE FROM results WHERE id = %s", (result_id,))
             conn.commit()
+            _fetch_results.clear()
             return True
     except Exception as e:
         st.error(f"Error deleting result: {e}")
@@ -747,9 +934,10 @@ def retrieve_sop_context(query_text, limit=8):
         f"{joined}\n===END SOP PROCEDURES===\n"
     )
 
-def get_fees_block():
+def get_fees_block(kb=None):
     """Extract the authoritative fees block from the HRL Knowledge Base."""
-    kb = load_knowledge_base()
+    if kb is None:
+        kb = load_knowledge_base()
     start_marker = "===FEES_START==="
     end_marker = "===FEES_END==="
     start_idx = kb.find(start_marker)
@@ -864,12 +1052,13 @@ def sync_corrections_to_knowledge_base():
     save_knowledge_base(new_content)
 
 
-def load_config():
-    """Loads the configuration from the database, migrating from config.json on first run."""
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_config():
+    """Reads the config from the database, migrating from config.json on first run.
+    Raises on database errors so failures are not cached."""
     db_pool = get_db_pool()
     if not db_pool:
-        st.error("Database connection is not available for loading config.")
-        return {"staff_roles": {}, "org_chart": {'nodes': [], 'edges': []}}
+        raise RuntimeError("Database connection is not available for loading config.")
     conn = None
     try:
         conn = db_pool.getconn()
@@ -898,13 +1087,18 @@ def load_config():
                     return config_data
                 except (FileNotFoundError, json.JSONDecodeError):
                     return {"staff_roles": {}, "org_chart": {'nodes': [], 'edges': []}}
-    except Exception as e:
-        st.error(f"Error loading configuration from database: {e}")
-        return {"staff_roles": {}, "org_chart": {'nodes': [], 'edges': []}}
     finally:
         if conn:
             db_pool.putconn(conn)
 
+def load_config():
+    """Loads the configuration; cached between reruns and cleared by save_config()."""
+    try:
+        return _fetch_config()
+    except Exception as e:
+        st.error(f"Error loading configuration from database: {e}")
+        return {"staff_roles": {}, "org_chart": {'nodes': [], 'edges': []}}
+
 def save_config(config_data):
     """Saves the configuration to the database."""
     db_pool = get_db_pool()
@@ -926,6 +1120,7 @@ def save_config(config_data):
                 (json.dumps(config_data),)
             )
             conn.commit()
+        _fetch_config.clear()
         return True
     except Exception as e:
         st.error(f"Failed to save configuration to database: {e}")
@@ -1211,6 +1406,7 @@ def save_users(users_dict):
                     )
                 )
             conn.commit()
+        _invalidate_users_cache()
         return True
     except Exception as e:
         st.error(f"Error saving users: {e}")
@@ -1227,19 +1423,170 @@ def save_assignments(assignments_data):
     # This stub exists for legacy call-sites and returns True to avoid crashes.
     return True
 
+def render_org_edges(edges):
+    """Prompt lines for (source, target) reporting edges."""
+    return "\n".join(f"- {source} reports to {target}" for source, target in edges)
+
 # Load initial configuration
 config = load_config()
 STAFF_ROLES = config.get("staff_roles", {})
 ORG_CHART = config.get("org_chart", {'nodes': [], 'edges': []})
+ORG_EDGES_TEXT = render_org_edges((edge['source'], edge['target']) for edge in ORG_CHART.get('edges', []))
+# Supervisor role -> roles that report directly to it
+REPORTS_BY_TARGET = {}
+for _edge in ORG_CHART.get('edges', []):
+    REPORTS_BY_TARGET.setdefault(_edge['target'], []).append(_edge['source'])
 GUIDING_NORTH_FRAMEWORK = load_framework()
 HRL_KNOWLEDGE_BASE = load_knowledge_base()
 UND_WEBSITE_KB = load_website_kb()
 HOUSING_BEST_PRACTICES = load_best_practices()
 
+PROMPT_GROUNDING_SCENARIO = "Your primary tool is the following document:"
+PROMPT_GROUNDING_ANALYSIS = "Your analysis MUST be based *strictly* on the following framework document:"
+
+@functools.lru_cache(maxsize=8)
+def _build_static_prompt_prefix(grounding, framework, knowledge_base, website_kb, best_practices):
+    """Joins the reference corpora into the prompt prefix; memoized on the corpus strings themselves."""
+    return "".join([
+        "**System Grounding:** You are an expert training assistant for the University of North Dakota Housing & Residence Life, "
+        f"specializing in the Guiding NORTH Framework. {grounding}\n\n",
+        f"---\n{framework}\n---\n\n",
+        "**Operational Knowledge Base (protocols, policies & supervisor-approved exemplary standards — "
+        "authoritative source for all fees, hours, locations, procedures):**\n",
+        f"---\n{knowledge_base}\n{get_fees_block(knowledge_base)}\n---\n\n",
+        f"**UND Housing Website Notes (public info & links):**\n---\n{website_kb}\n---\n\n",
+        f"**Best Practices (on-campus housing):**\n---\n{best_practices}\n---\n",
+    ])
+
+def get_static_prompt_prefix(grounding=PROMPT_GROUNDING_ANALYSIS):
+    """Returns the unchanging head of the scenario/evaluation prompts (framework, KB, fees, website, best practices).
+    Per-request content such as SOP excerpts, role details and the user's text belongs after it."""
+    return _build_static_prompt_prefix(
+        grounding, GUIDING_NORTH_FRAMEWORK, load_knowledge_base(), UND_WEBSITE_KB, HOUSING_BEST_PRACTICES
+    )
+
+def build_org_structure_block(role_name, role_info):
+    """The reporting-line section shared by the scenario, evaluation and call analysis prompts."""
+    return (
+        "**Organizational Structure:**\n---\n"
+        f"The '{role_name}' reports to: {role_info.get('supervisor', 'Not specified')}\n\n"
+        f"Organizational Chart Reporting Relationships:\n{ORG_EDGES_TEXT}\n---\n"
+    )
+
+PROMPT_CACHE_TTL_SECONDS = 3600
+
+@st.cache_resource
+def _prompt_cache_registry():
+    """Process-wide map of prompt-prefix key -> Gemini context cache, shared by all sessions."""
+    return {"lock": threading.Lock(), "entries": {}}
+
+def _prompt_cache_key(client, model, prefix):
+    # Context caches belong to the API key's project; get_genai_client shares one client per key,
+    # so the client's identity stands in for the key
+    return (id(client), model, hashlib.sha256(prefix.encode()).hexdigest())
+
+def _forget_prompt_cache(client, model, prefix):
+    registry = _prompt_cache_registry()
+    with registry["lock"]:
+        registry["entries"].pop(_prompt_cache_key(client, model, prefix), None)
+
+def _is_missing_cache_error(exc):
+    """True when a generate call failed because its context cache is gone (deleted or expired)."""
+    if not isinstance(exc, genai_errors.APIError):
+        return False
+    return exc.code == 404 or exc.status == "NOT_FOUND" or "expired" in str(exc).lower()
+
+def get_prompt_cache_name(client, model, prefix):
+    """Returns the name of a Gemini context cache holding `prefix`, creating it on first use.
+    The cache is shared by every session using the same API key and model.
+    Returns None when caching is unavailable (unsupported model, prefix below the minimum size, API error)."""
+    key = _prompt_cache_key(client, model, prefix)
+    registry = _prompt_cache_registry()
+    # Held across the create call so concurrent sessions don't each pay for a duplicate cache
+    with registry["lock"]:
+        entry = registry["entries"].get(key)
+        now = time.time()
+        if entry and entry["expires"] > now + 60:
+            return entry["name"]
+        try:
+            cache = client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    contents=[prefix],
+                    display_name="guiding-north-prompt-prefix",
+                    ttl=f"{PROMPT_CACHE_TTL_SECONDS}s"
+                )
+            )
+        except Exception:
+            # Remember the failure for a while so every click doesn't retry the create call
+            registry["entries"][key] = {"name": None, "expires": now + 600}
+            return None
+        registry["entries"][key] = {"name": cache.name, "expires": now + PROMPT_CACHE_TTL_SECONDS}
+        return cache.name
+
+SCENARIO_MAX_OUTPUT_TOKENS = 2048
+EVALUATION_MAX_OUTPUT_TOKENS = 4096
+RETRY_MAX_OUTPUT_TOKENS = 15000
+
+def _hit_token_limit(response):
+    try:
+        return response.candidates[0].finish_reason == types.FinishReason.MAX_TOKENS
+    except (AttributeError, IndexError, TypeError):
+        return False
+
+def stream_markdown(chunks, placeholder=None):
+    """Renders streamed response chunks into one placeholder as they arrive; returns the full text."""
+    placeholder = placeholder or st.empty()
+    text = ""
+    for chunk in chunks:
+        if chunk.text:
+            text += chunk.text
+            placeholder.markdown(text)
+    return text
+
+def _open_stream(client, model, contents, config):
+    chunks = client.models.generate_content_stream(model=model, contents=contents, config=config)
+    # Pull the first chunk now so request errors surface here rather than midway through rendering
+    first = next(chunks, None)
+    return itertools.chain([first] if first is not None else [], chunks)
+
+def generate_with_prompt_cache(client, model, prefix, tail, config=None, retry_max_output_tokens=None, stream=False):
+    """Generates content with `prefix` served from a Gemini context cache, sending only `tail`.
+    Falls back to sending the full prompt if no cache can be created or the cache has expired or been
+    deleted; other errors are raised rather than retried at full cost. If the reply is cut off at
+    max_output_tokens and `retry_max_output_tokens` is given, retries once with that larger budget.
+    With stream=True, returns an iterator of response chunks instead (no truncation retry)."""
+    config = config or types.GenerateContentConfig()
+    call = functools.partial(_open_stream, client) if stream else (
+        lambda model, contents, config: client.models.generate_content(model=model, contents=contents, config=config)
+    )
+
+    def _generate(cfg):
+        cache_name = get_prompt_cache_name(client, model, prefix)
+        if cache_name:
+            try:
+                return call(model=model, contents=tail, config=cfg.model_copy(update={"cached_content": cache_name}))
+            except Exception as e:
+                if not _is_missing_cache_error(e):
+                    raise
+                # Cache expired or was deleted server-side; forget it and send the full prompt
+                _forget_prompt_cache(client, model, prefix)
+        return call(model=model, contents=prefix + tail, config=cfg)
+
+    response = _generate(config)
+    if not stream and retry_max_output_tokens and _hit_token_limit(response):
+        response = _generate(config.model_copy(update={"max_output_tokens": retry_max_output_tokens}))
+    return response
+
 def build_scenario_prompt(role_name, difficulty, topic="",
                           last_scenario_text="None", building_history_text="None"):
     """Single source of truth for all scenario generation prompts.
     Used by both the self-practice generator and the supervisor assign flow."""
+    return "".join(build_scenario_prompt_parts(role_name, difficulty, topic, last_scenario_text, building_history_text))
+
+def build_scenario_prompt_parts(role_name, difficulty, topic="",
+                                last_scenario_text="None", building_history_text="None"):
+    """Returns the scenario prompt as (static prefix, per-request tail) so the prefix can be context-cached."""
     role_info = STAFF_ROLES.get(role_name, {})
 
     # Resolve role KB entry (schedule + location constraints)
@@ -1273,37 +1620,10 @@ def build_scenario_prompt(role_name, difficulty, topic="",
 
     sop_query = f"{role_name} {topic}".strip()
 
-    return f"""
-    **System Grounding:** You are an expert training assistant for the University of North Dakota Housing & Residence Life, specializing in the Guiding NORTH Framework. Your primary tool is the following document:
-
-    ---
-    {GUIDING_NORTH_FRAMEWORK}
-    ---
-
-    **Operational Knowledge Base (protocols & policies — authoritative source for all fees, hours, locations, procedures):**
-    ---
-    {load_knowledge_base()}
+    return get_static_prompt_prefix(PROMPT_GROUNDING_SCENARIO), f"""
     {retrieve_sop_context(sop_query)}
-    {get_fees_block()}
-    ---
 
-    **UND Housing Website Notes (public info & links):**
-    ---
-    {UND_WEBSITE_KB}
-    ---
-
-    **Best Practices (on-campus housing):**
-    ---
-    {HOUSING_BEST_PRACTICES}
-    ---
-
-    **Organizational Structure:**
-    ---
-    The '{role_name}' reports to: {role_info.get('supervisor', 'Not specified')}
-
-    Organizational Chart Reporting Relationships:
-    {chr(10).join([f"- {edge['source']} reports to {edge['target']}" for edge in ORG_CHART.get('edges', [])])}
-    ---
+    {build_org_structure_block(role_name, role_info)}
 
     **Role Description/Job Details:**
     ---
@@ -1383,13 +1703,12 @@ def build_scenario_prompt(role_name, difficulty, topic="",
     """
 
 
+def extract_text_from_pdf(pdf_file):
     """Extracts text from an uploaded PDF file."""
     try:
-        pdf_reader = PdfReader(io.BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
+        # UploadedFile is file-like, so PdfReader can seek it directly without a BytesIO copy
+        pdf_reader = PdfReader(pdf_file)
+        return "".join(page.extract_text() or "" for page in pdf_reader.pages)
     except Exception as e:
         st.error(f"Error reading PDF: {e}")
         return None
@@ -1435,12 +1754,494 @@ def get_supervisor_visible_users(supervisor_email, users_db, org_chart):
     
     return visible_users
 
+@st.cache_resource(max_entries=8, show_spinner=False)
+def build_org_chart_elements(node_labels, edges):
+    """agraph Node/Edge lists for ((role, label), ...) and ((source, target), ...), reused across reruns."""
+    nodes = [Node(id=role, label=label, size=25) for role, label in node_labels]
+    edge_objs = [Edge(source=source, target=target, label="reports to") for source, target in edges]
+    return nodes, edge_objs
+
+@st.cache_data(ttl=300, show_spinner=False)
+def partition_results(emails, roles, viewer_email, direct_reports, access):
+    """Indices of the results a viewer may see, overall and per role. Takes only the email and role
+    columns so the cache key stays small and a hit copies back indices rather than result bodies."""
+    if access == "admin":
+        visible = list(range(len(emails)))
+    elif access == "supervisor":
+        direct_reports_set = set(direct_reports)
+        allowed_emails = {viewer_email}
+        allowed_emails.update(email for email, role in zip(emails, roles) if role in direct_reports_set)
+        visible = [i for i, email in enumerate(emails) if email in allowed_emails]
+    else:
+        visible = [i for i, email in enumerate(emails) if email == viewer_email]
+    # One pass builds every role bucket and, from its keys, the role tab list
+    by_role = defaultdict(list)
+    for i in visible:
+        by_role[roles[i]].append(i)
+    return {"all": visible, "roles": sorted(role for role in by_role if role), "by_role": dict(by_role)}
+
+def analytics_fingerprint(results):
+    """Columnar (scores, timestamps, difficulties) view of a results slice, used as the analytics cache key."""
+    rows = [(res.get("overall_score", "0"), res.get("timestamp", "N/A"), res.get("difficulty", "N/A")) for res in results]
+    return tuple(zip(*rows)) if rows else ((), (), ())
+
+SCORE_ROLLING_WINDOW = 5
+
+def rolling_mean(values, window=SCORE_ROLLING_WINDOW):
+    """Trailing mean over up to `window` points via one cumulative sum (the first points average what exists)."""
+    values = np.asarray(values, dtype=np.float32)
+    totals = np.cumsum(values)
+    totals[window:] -= totals[:-window].copy()
+    return totals / np.minimum(np.arange(1, len(values) + 1), window)
+
+def linear_trend(x, y):
+    """Least-squares (slope, intercept) in closed form; a flat line through the mean when x has no spread."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_mean, y_mean = x.mean(), y.mean()
+    x_dev = x - x_mean
+    denom = (x_dev * x_dev).sum()
+    slope = float((x_dev * (y - y_mean)).sum() / denom) if denom else 0.0
+    return slope, float(y_mean - slope * x_mean)
+
+@functools.cache
+def parse_score(raw):
+    """Numeric value of a stored overall score: all-digit strings as-is, otherwise the first digit (None if none)."""
+    score_str = str(raw).strip()
+    if score_str.isdigit():
+        return int(score_str)
+    return next((int(char) for char in score_str if char.isdigit()), None)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def compute_role_analytics(columns):
+    """Computes score aggregates for a results slice; pure, so reruns with the same columns hit the cache."""
+    score_col, timestamp_col, difficulty_col = columns
+    # parse_score is memoised, so the handful of distinct stored scores are each parsed once; missing ones become NaN
+    parsed = np.array([parse_score(value) for value in score_col], dtype=float)
+    score_arr = parsed[~np.isnan(parsed)]
+    scores = score_arr.astype(int).tolist()
+
+    # One pass over the charted (positive) scores builds the points and the per-difficulty
+    # running (sum, count); the trend and rolling average then work on the same arrays
+    chart_idx = np.flatnonzero(parsed > 0)
+    chart_scores = parsed[chart_idx]
+    chart_data = []
+    difficulty_totals = {}
+    for idx, score in zip(chart_idx.tolist(), chart_scores.astype(int).tolist()):
+        difficulty = difficulty_col[idx]
+        chart_data.append({
+            "attempt": idx + 1,
+            "score": score,
+            "date": timestamp_col[idx][:10],
+            "difficulty": difficulty
+        })
+        total, count = difficulty_totals.get(difficulty, (0, 0))
+        difficulty_totals[difficulty] = (total + score, count + 1)
+
+    improvement = None
+    if len(score_arr) >= 2:
+        midpoint = len(score_arr) // 2
+        improvement = float(score_arr[midpoint:].mean() - score_arr[:midpoint].mean())
+
+    trend, trendline = None, []
+    if chart_data:
+        attempts = chart_idx + 1.0
+        slope, intercept = linear_trend(attempts, chart_scores)
+        trend = [slope, intercept]
+        trendline = (slope * attempts + intercept).tolist()
+
+    return {
+        "scores": scores,
+        "avg": (sum(scores) / len(scores)) if scores else 0,
+        "chart_data": chart_data,
+        "rolling_avg": rolling_mean(chart_scores).tolist(),
+        # Second-half minus first-half average; None with fewer than two scores
+        "improvement": improvement,
+        # [slope, intercept] of the linear fit over attempts, and its values at each attempt
+        "trend": trend,
+        "trendline": trendline,
+        # (difficulty, mean score, attempts), sorted by difficulty
+        "difficulty_summary": [
+            (difficulty, total / count, count)
+            for difficulty, (total, count) in sorted(difficulty_totals.items(), key=lambda item: str(item[0]))
+        ],
+    }
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def build_progression_figure(attempts, scores, rolling_avg, trendline):
+    """Score progression chart with rolling average and trendline; cached by its (tuple) series."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=attempts,
+        y=scores,
+        mode='lines+markers',
+        name='Score',
+        line=dict(color='#1f77b4', width=2),
+        marker=dict(size=8)
+    ))
+    fig.add_trace(go.Scatter(
+        x=attempts,
+        y=rolling_avg,
+        mode='lines',
+        name=f'Rolling Avg ({SCORE_ROLLING_WINDOW})',
+        line=dict(color='#2ca02c', width=2)
+    ))
+    fig.add_trace(go.Scatter(
+        x=attempts,
+        y=trendline,
+        mode='lines',
+        name='Trend',
+        line=dict(color='red', width=2, dash='dash')
+    ))
+    fig.update_layout(
+        title="Score Progression with Trendline",
+        xaxis_title="Attempt Number",
+        yaxis_title="Score (out of 4)",
+        hovermode='x unified',
+        height=400,
+        yaxis=dict(range=[0, 4])
+    )
+    return fig
+
+def results_display_frame(results):
+    """Date/Name/Role/Difficulty/Score table for st.dataframe, built column-wise rather than row by row."""
+    df = pd.DataFrame.from_records(
+        results, columns=["timestamp", "first_name", "last_name", "user_name", "role", "difficulty", "overall_score"]
+    )
+    first_name = df["first_name"]
+    return pd.DataFrame({
+        "Date": df["timestamp"].fillna("N/A").astype(str).str[:10],
+        "Name": (first_name.fillna("") + " " + df["last_name"].fillna("")).where(
+            first_name.notna(), df["user_name"].fillna("N/A")
+        ),
+        "Role": df["role"].fillna("N/A"),
+        "Difficulty": df["difficulty"].fillna("N/A"),
+        "Score": df["overall_score"].fillna("N/A"),
+    })
+
+CALL_ANALYSIS_CACHE_SIZE = 64
+
+@st.cache_resource
+def _call_analysis_cache():
+    """Process-wide LRU of call analysis text, shared by all sessions."""
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+def cached_call_analysis(key_parts, generate):
+    """Returns the analysis text for `key_parts` (model, prompt and any audio bytes), calling
+    `generate()` only on a miss. Identical resubmissions skip the Gemini call."""
+    digest = hashlib.sha256()
+    for part in key_parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\x00")
+    key = digest.hexdigest()
+    cache = _call_analysis_cache()
+    with cache["lock"]:
+        if key in cache["entries"]:
+            cache["entries"].move_to_end(key)
+            return cache["entries"][key]
+    text = generate()
+    if text:
+        with cache["lock"]:
+            cache["entries"][key] = text
+            while len(cache["entries"]) > CALL_ANALYSIS_CACHE_SIZE:
+                cache["entries"].popitem(last=False)
+    return text
+
+_CALL_TASK_TRANSCRIPT = """
+**Task:** Evaluate the staff member's phone call performance using the 'Evaluation Rubric' from the framework document.
+1. Provide an 'Overall Score' from 1 (Needs Improvement) to 4 (Exemplary).
+2. For each of the five pillars (N, O, R, T, H), assign a rating (Needs Development, Proficient, or Exemplary) and provide a brief justification for your rating, citing specific examples from the call transcript.
+3. If any Relevant SOP Procedures were provided above, cite the Document ID(s) (format: HRL-XXX-XX) of any sections you relied on in your evaluation.
+4. Provide specific suggestions for improvement where applicable.
+5. Conclude with a full, detailed 'Exemplary Call Example' that demonstrates how a top-performing staff member would have handled the call from start to finish.
+"""
+
+_CALL_TASK_AUDIO = """
+**Task:**
+1. First, provide a complete transcript of the phone call.
+2. Then, evaluate the staff member's phone call performance using the 'Evaluation Rubric' from the framework document.
+3. Provide an 'Overall Score' from 1 (Needs Improvement) to 4 (Exemplary).
+4. For each of the five pillars (N, O, R, T, H), assign a rating (Needs Development, Proficient, or Exemplary) and provide a brief justification for your rating, citing specific examples from the call.
+5. If any Relevant SOP Procedures were provided above, cite the Document ID(s) (format: HRL-XXX-XX) of any sections you relied on in your evaluation.
+6. Provide specific suggestions for improvement where applicable.
+7. Conclude with a full, detailed 'Exemplary Call Example' that demonstrates how a top-performing staff member would have handled the call from start to finish.
+"""
+
+_CALL_OUTPUT_FORMAT = """
+**Output Format (Strict):**
+### Call Transcript:
+[Full transcript of the call]
+
+---
+
+### Guiding NORTH Evaluation:
+
+OVERALL_SCORE: [Your 1-4 Rating]
+
+**Overall Score:** [Your 1-4 Rating]
+
+---
+
+**N - Navigate Needs:**
+- **Rating:** [Your Rating]
+- **Justification:** [Your Justification]
+
+**O - Own the Outcome:**
+- **Rating:** [Your Rating]
+- **Justification:** [Your Justification]
+
+**R - Respect & Relationships:**
+- **Rating:** [Your Rating]
+- **Justification:** [Your Justification]
+
+**T - Trust Through Transparency:**
+- **Rating:** [Your Rating]
+- **Justification:** [Your Justification]
+
+**H - Hope & Healing:**
+- **Rating:** [Your Rating]
+- **Justification:** [Your Justification]
+
+---
+
+### Relevant SOP Citations:
+(list any SOP Document IDs referenced, e.g. HRL-XXX-XX, or write "None" if no SOP documents were provided)
+
+---
+
+### Suggestions for Improvement:
+[Your Suggestions]
+
+---
+
+### Exemplary Call Example:
+[Your Detailed Example]
+"""
+
+ROLE_DESCRIPTION_TOP_K = 4
+ROLE_DESCRIPTION_FULL_CHARS = 4000
+_TERM_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do does for from had has have he her
+him his how i if in into is it its just me my no not of on or our out she so than that the their them then there
+these they this to too up us was we were what when where which who will with would you your yes okay ok um uh
+""".split())
+
+def _terms(text):
+    """Distinct lowercased terms of `text`, without stopwords."""
+    return set(_TERM_RE.findall(text.lower())) - _STOPWORDS
+
+@functools.lru_cache(maxsize=32)
+def _role_description_index(description):
+    """Chunks a role description once and returns (chunks, vocabulary, IDF weights, L2-normalised TF-IDF matrix)."""
+    chunks = chunk_text(description, chunk_size=150, overlap=20)
+    vocab = {}
+    rows = [[vocab.setdefault(term, len(vocab)) for term in _terms(chunk)] for chunk in chunks]
+    matrix = np.zeros((len(chunks), len(vocab)), dtype=np.float32)
+    for i, ids in enumerate(rows):
+        matrix[i, ids] = 1.0
+    # Terms found in most chunks say little about which chunk is relevant
+    idf = np.log((1 + len(chunks)) / (1 + matrix.sum(axis=0))) + 1.0
+    matrix *= idf
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-6)
+    return chunks, vocab, idf, matrix
+
+def relevant_role_description(description, query, k=ROLE_DESCRIPTION_TOP_K):
+    """Returns a long role description cut down to the k chunks most similar to `query` (TF-IDF cosine,
+    stopwords ignored), kept in document order and labelled as excerpts.
+    Short descriptions, and queries with no overlap, get the full text."""
+    if len(description) <= ROLE_DESCRIPTION_FULL_CHARS:
+        return description
+    chunks, vocab, idf, matrix = _role_description_index(description)
+    ids = [vocab[term] for term in _terms(query) if term in vocab]
+    if len(chunks) <= k or not ids:
+        return description
+    query_vec = np.zeros(len(vocab), dtype=np.float32)
+    query_vec[ids] = idf[ids]
+    top = np.sort(np.argpartition(matrix @ query_vec, -k)[-k:])
+    return "".join([
+        f"(Excerpts: {k} of {len(chunks)} sections most relevant to this call.)\n",
+        "\n...\n".join(chunks[i] for i in top),
+    ])
+
+def build_call_analysis_prompt(call_role, first_name, last_name, transcript=None):
+    """Returns the call analysis prompt as (static prefix, per-call tail) for both input methods.
+    With no transcript the tail asks Gemini to transcribe the recording sent between prefix and tail.
+    The knowledge-base prefix is built once and cached; only the short tail is assembled per call."""
+    role_info = STAFF_ROLES.get(call_role, {})
+    description = role_info.get('description', 'Not provided.')
+    if transcript is None:
+        sop_query = call_role
+        source_line = "- **Audio:** Please transcribe and analyze the audio recording provided.\n"
+        task = _CALL_TASK_AUDIO
+    else:
+        sop_query = (call_role + ' ' + transcript)[:600]
+        description = relevant_role_description(description, transcript[:1000])
+        source_line = "".join(["- **Call Transcript:** ", transcript, "\n"])
+        task = _CALL_TASK_TRANSCRIPT
+    tail = "".join([
+        "\n", retrieve_sop_context(sop_query), "\n\n",
+        build_org_structure_block(call_role, role_info), "\n\n",
+        "**Role Description/Job Details:**\n---\n",
+        description, "\n---\n\n",
+        "**Context for Evaluation:**\n",
+        "- **Role:** ", call_role, "\n",
+        "- **Staff Member:** ", first_name, " ", last_name, "\n",
+        source_line,
+        task,
+        _CALL_OUTPUT_FORMAT,
+    ])
+    return get_static_prompt_prefix(PROMPT_GROUNDING_ANALYSIS), tail
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def count_tokens(_client, model, text):
+    """Gemini token count for `text`; cached so the static prefix and repeated transcripts are counted once."""
+    return _client.models.count_tokens(model=model, contents=text).total_tokens
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def model_input_token_limit(_client, model):
+    """The model's input token limit (None if not reported); raises on API errors so they are not cached."""
+    return _client.models.get(model=model).input_token_limit
+
+# Rough characters-per-token ratio for the local estimate, and the share of the input limit below which
+# the estimate is trusted without asking the API for an exact count
+CHARS_PER_TOKEN_ESTIMATE = 4
+TOKEN_ESTIMATE_SAFE_FRACTION = 0.8
+
+def fit_transcript_to_budget(client, model, prefix, tail, transcript):
+    """Returns (transcript, prompt tokens), trimming the transcript when the prompt would exceed the model's
+    input limit so an oversized request fails fast instead of after a wasted round-trip.
+    Prompts well under the limit are sized locally (chars / 4), so the token count is then an estimate;
+    count_tokens is only called near the limit.
+    If tokens cannot be counted the transcript is returned unchanged with a count of None."""
+    estimate = (len(prefix) + len(tail)) // CHARS_PER_TOKEN_ESTIMATE
+    try:
+        limit = model_input_token_limit(client, model)
+        if not limit or estimate < limit * TOKEN_ESTIMATE_SAFE_FRACTION:
+            return transcript, estimate
+        prompt_tokens = count_tokens(client, model, prefix) + count_tokens(client, model, tail)
+        if not limit or prompt_tokens <= limit:
+            return transcript, prompt_tokens
+        transcript_tokens = count_tokens(client, model, transcript)
+    except Exception:
+        return transcript, None
+    keep_tokens = max(transcript_tokens - (prompt_tokens - limit), 0)
+    keep_chars = len(transcript) * keep_tokens // max(transcript_tokens, 1)
+    return transcript[:keep_chars], prompt_tokens - transcript_tokens + keep_tokens
+
+BATCH_FINISHED_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+def audio_mime_type(audio_file):
+    return audio_file.type or mimetypes.guess_type(audio_file.name)[0] or "audio/mpeg"
+
+AUDIO_UPLOAD_WORKERS = 5
+
+def upload_audio_files(client, audio_files):
+    """Uploads recordings to the Gemini Files API, up to AUDIO_UPLOAD_WORKERS at a time.
+    Uploads are network-bound, so overlapping them cuts the wait to roughly N / workers uploads.
+    Returns the uploaded file handles in input order."""
+    def upload(audio):
+        return client.files.upload(
+            file=io.BytesIO(audio.getvalue()),
+            config=types.UploadFileConfig(mime_type=audio_mime_type(audio), display_name=audio.name),
+        )
+    with ThreadPoolExecutor(max_workers=min(AUDIO_UPLOAD_WORKERS, len(audio_files) or 1)) as executor:
+        return list(executor.map(upload, audio_files))
+
+def submit_call_analysis_batch(client, model, call_role, first_name, last_name, audio_files):
+    """Queues one analysis request per recording on the Gemini Batch API and returns the job.
+    Batch jobs are asynchronous and billed at a discount, so this suits bulk reviews rather than live use."""
+    prefix, tail = build_call_analysis_prompt(call_role, first_name, last_name)
+    # Reference uploaded files rather than inlining audio bytes, which would hit the inline request size limit
+    requests = [
+        types.InlinedRequest(
+            contents=[types.Content(role="user", parts=[
+                types.Part.from_text(text=prefix),
+                types.Part.from_uri(file_uri=uploaded.uri, mime_type=uploaded.mime_type),
+                types.Part.from_text(text=tail),
+            ])],
+            config=types.GenerateContentConfig(temperature=0.7, max_output_tokens=15000),
+        )
+        for uploaded in upload_audio_files(client, audio_files)
+    ]
+    return client.batches.create(
+        model=model,
+        src=requests,
+        config=types.CreateBatchJobConfig(display_name=f"call-analysis-{last_name}-{len(requests)}"),
+    )
+
+def collect_call_analysis_batch(client, job):
+    """Checks a submitted batch job; once it succeeds, saves each analysis as a pending result.
+    Returns (state name, number saved), where the state is None while the job is still running."""
+    batch = client.batches.get(name=job["name"])
+    state = batch.state.name if batch.state else ""
+    if state not in BATCH_FINISHED_STATES:
+        return None, 0
+    saved = 0
+    if state == "JOB_STATE_SUCCEEDED" and batch.dest:
+        # Inlined responses come back in request order
+        for file_name, item in zip(job["files"], batch.dest.inlined_responses or []):
+            analysis_text = item.response.text if item.response and not item.error else ""
+            if not analysis_text:
+                continue
+            m = _CALL_SCORE_RE.search(analysis_text)
+            exemplary = extract_exemplary_response(analysis_text)
+            if save_results({
+                "first_name": job["first_name"],
+                "last_name": job["last_name"],
+                "email": job["email"],
+                "timestamp": datetime.now().isoformat(),
+                "role": job["role"],
+                "difficulty": "Call Analysis (Audio)",
+                "scenario": f"Phone Call Recording ({file_name})",
+                "user_response": analysis_text[:1000],
+                "evaluation": analysis_text,
+                "overall_score": m.group(1).strip() if m else "Not Found",
+                "status": "pending",
+                "exemplary_response": exemplary,
+            }):
+                saved += 1
+    return state, saved
+
 # --- Gemini API Configuration ---
+FALLBACK_MODELS = [
+    'models/gemini-2.0-flash-exp',
+    'models/gemini-1.5-pro',
+    'models/gemini-1.5-flash'
+]
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def list_generate_models(_client, api_key_id):
+    """Names of Gemini models that support generateContent, fetched at most hourly per API key.
+    `api_key_id` only distinguishes keys in the cache; raises on API errors so they are not cached."""
+    return [
+        m.name for m in _client.models.list()
+        if 'gemini' in m.name.lower()
+        and 'generateContent' in (getattr(m, 'supported_actions', None) or ['generateContent'])
+    ]
+
+def load_available_models(api_key):
+    """Populates st.session_state.models (and a default selected_model), falling back to a fixed list."""
+    try:
+        models = list_generate_models(
+            st.session_state.genai_client, hashlib.sha256(api_key.encode()).hexdigest()
+        )
+    except Exception:
+        models = []
+    st.session_state.models = models or list(FALLBACK_MODELS)
+    if 'selected_model' not in st.session_state:
+        st.session_state.selected_model = st.session_state.models[0]
+
+@st.cache_resource(show_spinner=False)
+def get_genai_client(api_key):
+    """Creates one Gemini client per API key and shares it across reruns and sessions."""
+    return genai.Client(api_key=api_key)
+
 def configure_genai(api_key):
     """Configures the Gemini API with the provided key."""
     try:
         # Create client with the new SDK
-        st.session_state.genai_client = genai.Client(api_key=api_key)
+        st.session_state.genai_client = get_genai_client(api_key)
         return True
     except Exception as e:
         st.error(f"Failed to configure Gemini API: {e}")
@@ -1476,7 +2277,10 @@ if _token_param:
         _token_client_tmp = st.session_state.get("genai_client")
         if _token_client_tmp:
             try:
-                _available = [m.name for m in _token_client_tmp.models.list() if "gemini" in m.name.lower()]
+                # Shares the hourly model-list cache with the main app instead of listing per visit
+                _available = list_generate_models(
+                    _token_client_tmp, hashlib.sha256(_api_key_for_token.encode()).hexdigest()
+                )
                 if _available:
                     _token_model = _available[0]
             except Exception:
@@ -1634,23 +2438,7 @@ with st.sidebar:
                 st.session_state.api_configured = True
                 st.success("✅ Gemini API Configured from Secrets!")
                 with st.spinner("Fetching available models..."):
-                    try:
-                        models_pager = st.session_state.genai_client.models.list()
-                        st.session_state.models = [m.name for m in models_pager if 'gemini' in m.name.lower()]
-                        if not st.session_state.models:
-                            # Fallback if no gemini models found
-                            st.session_state.models = [
-                                'models/gemini-2.0-flash-exp',
-                                'models/gemini-1.5-pro',
-                                'models/gemini-1.5-flash'
-                            ]
-                    except Exception as e:
-                        # Use fallback models on error
-                        st.session_state.models = [
-                            'models/gemini-2.0-flash-exp',
-                            'models/gemini-1.5-pro',
-                            'models/gemini-1.5-flash'
-                        ]
+                    load_available_models(api_key_secret)
             else:
                 st.session_state.api_configured = False
     else:
@@ -1663,27 +2451,7 @@ with st.sidebar:
                     st.session_state.api_configured = True
                     st.success("Gemini API Configured Successfully!")
                     with st.spinner("Fetching available models..."):
-                        try:
-                            models_pager = st.session_state.genai_client.models.list()
-                            st.session_state.models = [m.name for m in models_pager if 'gemini' in m.name.lower()]
-                            if not st.session_state.models:
-                                # Fallback if no gemini models found
-                                st.session_state.models = [
-                                    'models/gemini-2.0-flash-exp',
-                                    'models/gemini-1.5-pro',
-                                    'models/gemini-1.5-flash'
-                                ]
-                            # Set default model if not already set
-                            if 'selected_model' not in st.session_state and st.session_state.models:
-                                st.session_state.selected_model = st.session_state.models[0]
-                        except Exception as e:
-                            # Use fallback models on error
-                            st.session_state.models = [
-                                'models/gemini-2.0-flash-exp',
-                                'models/gemini-1.5-pro',
-                                'models/gemini-1.5-flash'
-                            ]
-                            st.session_state.selected_model = st.session_state.models[0]
+                        load_available_models(api_key)
                 else:
                     st.session_state.api_configured = False
             else:
@@ -1756,11 +2524,21 @@ if st.sidebar.button("Login", key="login_button"):
         st.sidebar.error("Please enter all required fields.")
     elif email_input not in users_db:
         st.sidebar.error("Email not registered. Contact your administrator.")
-    elif not check_password_hash(users_db[email_input]["password_hash"], password_input):
+    elif not verify_password(users_db[email_input]["password_hash"], password_input):
         st.sidebar.error("Incorrect password.")
     else:
         # Successful login - load user data from database
         user_data = users_db[email_input]
+        if password_needs_rehash(user_data.get("password_hash")):
+            # Upgrade legacy hashes while the plaintext is available
+            save_user(
+                email=email_input,
+                password=password_input,
+                is_admin=user_data.get("is_admin", False),
+                first_name=user_data.get("first_name", ""),
+                last_name=user_data.get("last_name", ""),
+                position=user_data.get("position", "")
+            )
         st.session_state.first_name = user_data.get("first_name", "User")
         st.session_state.last_name = user_data.get("last_name", "")
         st.session_state.email = email_input
@@ -1768,10 +2546,7 @@ if st.sidebar.button("Login", key="login_button"):
         st.session_state.is_admin = user_data.get("is_admin", False)
         
         # Determine user role based on org chart
-        direct_reports = []
-        for edge in ORG_CHART.get('edges', []):
-            if edge['target'] == st.session_state.position:
-                direct_reports.append(edge['source'])
+        direct_reports = list(REPORTS_BY_TARGET.get(st.session_state.position, []))
         
         st.session_state.direct_reports = direct_reports
         st.session_state.user_role = "supervisor" if direct_reports else "staff"
@@ -1798,7 +2573,7 @@ if st.session_state.get("email"):
                 new_pwd_confirm = st.text_input("Confirm New Password:", type="password", key="new_pwd_confirm")
                 
                 if st.button("Update Password", key="update_pwd_btn"):
-                    if not check_password_hash(users_db[st.session_state.email]["password_hash"], current_pwd):
+                    if not verify_password(users_db[st.session_state.email]["password_hash"], current_pwd):
                         st.error("Current password is incorrect.")
                     elif len(new_pwd) < 6:
                         st.error("New password must be at least 6 characters.")
@@ -1828,11 +2603,18 @@ if st.session_state.get("email"):
                 new_is_admin = st.checkbox("Grant admin privileges", key="new_user_admin")
                 
                 if st.button("Create User", key="create_user_btn"):
+                    try:
+                        email_taken = new_email.lower() in user_email_index()
+                        email_check_error = None
+                    except Exception as e:
+                        email_taken, email_check_error = False, e
                     if not new_email or not new_first or not new_pwd_admin:
                         st.error("Email, name, and password are required.")
                     elif not validate_email(new_email):
                         st.error("Please enter a valid email address.")
-                    elif new_email.lower() in [k.lower() for k in users_db.keys()]:
+                    elif email_check_error is not None:
+                        st.error(f"Could not check existing users: {email_check_error}")
+                    elif email_taken:
                         st.error("This email is already registered (case-insensitive check).")
                     elif len(new_pwd_admin) < 6:
                         st.error("Password must be at least 6 characters.")
@@ -1915,7 +2697,7 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
         api_key_secret = st.secrets.get("gemini_api_key")
         if api_key_secret:
             try:
-                client = genai.Client(api_key=api_key_secret)
+                client = get_genai_client(api_key_secret)
                 st.session_state.genai_client = client
             except Exception as e:
                 st.error(f"Failed to initialize API client: {e}")
@@ -2030,20 +2812,23 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
             with st.spinner("Generating a new scenario..."):
                 last_scenario_text = st.session_state.scenario.strip() if st.session_state.scenario else "None"
                 building_history_text = ", ".join(st.session_state.get("building_history", [])) or "None"
-                prompt = build_scenario_prompt(
+                prompt_prefix, prompt_tail = build_scenario_prompt_parts(
                     role_name=selected_role,
                     difficulty=difficulty,
                     last_scenario_text=last_scenario_text,
                     building_history_text=building_history_text
                 )
                 try:
-                    response = client.models.generate_content(
-                        model=st.session_state.selected_model,
-                        contents=prompt,
+                    response = generate_with_prompt_cache(
+                        client,
+                        st.session_state.selected_model,
+                        prompt_prefix,
+                        prompt_tail,
                         config=types.GenerateContentConfig(
                             temperature=0.9,
-                            max_output_tokens=15000
-                        )
+                            max_output_tokens=SCENARIO_MAX_OUTPUT_TOKENS
+                        ),
+                        retry_max_output_tokens=RETRY_MAX_OUTPUT_TOKENS
                     )
                     st.session_state.scenario = response.text
                     st.session_state.evaluation = "" # Clear previous evaluation
@@ -2074,37 +2859,11 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                 if user_response:
                     with st.spinner("Evaluating your response..."):
                         role_info = STAFF_ROLES[selected_role]
+                        eval_prefix = get_static_prompt_prefix(PROMPT_GROUNDING_ANALYSIS)
                         eval_prompt = f"""
-                        **System Grounding:** You are an expert training assistant for the University of North Dakota Housing & Residence Life, specializing in the Guiding NORTH Framework. Your analysis MUST be based *strictly* on the following framework document:
-
-                        ---
-                        {GUIDING_NORTH_FRAMEWORK}
-                        ---
-
-                        **Operational Knowledge Base (protocols, policies & supervisor-approved exemplary standards):**
-                        ---
-                        {load_knowledge_base()}
                         {retrieve_sop_context((selected_role + ' ' + st.session_state.get('scenario', ''))[:600])}
-                        {get_fees_block()}
-                        ---
-
-                        **UND Housing Website Notes (public info & links):**
-                        ---
-                        {UND_WEBSITE_KB}
-                        ---
-
-                        **Best Practices (on‑campus housing):**
-                        ---
-                        {HOUSING_BEST_PRACTICES}
-                        ---
 
-                        **Organizational Structure:**
-                        ---
-                        The '{selected_role}' reports to: {role_info.get('supervisor', 'Not specified')}
-                        
-                        Organizational Chart Reporting Relationships:
-                        {chr(10).join([f"- {edge['source']} reports to {edge['target']}" for edge in ORG_CHART.get('edges', [])])}
-                        ---
+                        {build_org_structure_block(selected_role, role_info)}
 
                         **Context for Evaluation:**
                         - **Role:** {selected_role}
@@ -2155,22 +2914,21 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                         [Provide a full, detailed, and exemplary response to the original scenario here.]
                         """
                         try:
-                            evaluation_response = client.models.generate_content(
-                                model=st.session_state.selected_model,
-                                contents=eval_prompt,
+                            evaluation_response = generate_with_prompt_cache(
+                                client,
+                                st.session_state.selected_model,
+                                eval_prefix,
+                                eval_prompt,
                                 config=types.GenerateContentConfig(
                                     temperature=0.5,
-                                    max_output_tokens=15000
-                                )
+                                    max_output_tokens=EVALUATION_MAX_OUTPUT_TOKENS
+                                ),
+                                retry_max_output_tokens=RETRY_MAX_OUTPUT_TOKENS
                             )
                             st.session_state.evaluation = evaluation_response.text
                             # Save result to DB for supervisor review
-                            overall_score = "Not Found"
-                            for line in evaluation_response.text.splitlines():
-                                m = re.search(r"OVERALL_SCORE\s*:\s*([1-4])", line)
-                                if m:
-                                    overall_score = m.group(1)
-                                    break
+                            m = _OVERALL_SCORE_RE.search(evaluation_response.text)
+                            overall_score = m.group(1) if m else "Not Found"
                             save_results({
                                 "first_name": st.session_state.get("first_name", ""),
                                 "last_name": st.session_state.get("last_name", ""),
@@ -2204,42 +2962,62 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
         
         text_to_polish = st.text_area("Enter text to polish (e.g., an email, a case note, a text to a youth):", height=200, key="polish_input")
 
+        # Resubmitting the same text (ignoring surrounding whitespace and line endings) reuses the earlier revision
+        polish_cache = st.session_state.setdefault("polish_cache", {})
+        polish_key = (st.session_state.get('selected_model'), normalize_polish_text(text_to_polish))
+        last_polish = st.session_state.get("polish_last")
+
         if st.button("Polish My Text", key="polish_button"):
             if text_to_polish:
-                with st.spinner("Polishing your text..."):
-                    polish_prompt = f"""
-                    **Task:** Rewrite the following text to be more relational, strengths-based, and trauma-informed, ensuring it is consistent with the Guiding North Framework. The original meaning should be preserved, but the tone must be improved.
+                polished_text = polish_cache.get(polish_key)
+                if polished_text is not None:
+                    # Repeat click on unchanged input: show the stored revision without a Gemini call
+                    st.markdown("**Suggested Revision:**")
+                    st.markdown(polished_text)
+                    st.session_state.polish_last = (polish_key, polished_text)
+                else:
+                    with st.spinner("Polishing your text..."):
+                        polish_prompt = f"""
+                        **Task:** Rewrite the following text to be more relational, strengths-based, and trauma-informed, ensuring it is consistent with the Guiding North Framework. The original meaning should be preserved, but the tone must be improved.
 
-                    **Original Text:**
-                    "{text_to_polish}"
+                        **Original Text:**
+                        "{text_to_polish}"
 
-                    **Polished Text:**
-                    """
-                    try:
-                        # This assumes 'client' is defined and configured earlier, e.g., in the sidebar
-                        if st.session_state.get('selected_model') and st.session_state.api_configured:
-                            polished_response = client.models.generate_content(
-                                model=st.session_state.selected_model,
-                                contents=polish_prompt,
-                                config=types.GenerateContentConfig(
-                                    temperature=0.6,
-                                    max_output_tokens=500
-                                )
-                            )
-                            st.markdown("**Suggested Revision:**")
-                            st.markdown(polished_response.text)
-                        else:
-                            st.error("API is not configured. Please initialize it in the sidebar.")
-                    except Exception as e:
-                        st.error(f"Error polishing text: {e}")
+                        **Polished Text:**
+                        """
+                        try:
+                            # This assumes 'client' is defined and configured earlier, e.g., in the sidebar
+                            if st.session_state.get('selected_model') and st.session_state.api_configured:
+                                st.markdown("**Suggested Revision:**")
+                                polished_text = stream_markdown(client.models.generate_content_stream(
+                                    model=st.session_state.selected_model,
+                                    contents=polish_prompt,
+                                    config=types.GenerateContentConfig(
+                                        temperature=0.6,
+                                        max_output_tokens=500
+                                    )
+                                ))
+                                if len(polish_cache) >= POLISH_CACHE_SIZE:
+                                    polish_cache.pop(next(iter(polish_cache)))
+                                polish_cache[polish_key] = polished_text
+                                st.session_state.polish_last = (polish_key, polished_text)
+                            else:
+                                st.error("API is not configured. Please initialize it in the sidebar.")
+                        except Exception as e:
+                            st.error(f"Error polishing text: {e}")
             else:
                 st.warning("Please enter some text to polish.")
+        elif text_to_polish and last_polish and last_polish[0] == polish_key:
+            # Keep the latest revision on screen across unrelated reruns while the input is unchanged
+            st.markdown("**Suggested Revision:**")
+            st.markdown(last_polish[1])
 
     # Call Analysis Tab - Admin Only
     if st.session_state.get("is_admin"):
         with tab4:
             st.header("Call Analysis")
             st.write("Analyze customer phone call transcripts based on the Guiding North Framework.")
+            check_background_saves("_pending_call_saves", "Error saving call analysis to database")
             
             # Staff selector — auto-fills fields from DB
             call_users_db = load_users()
@@ -2287,127 +3065,41 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                 if st.button("🔍 Analyze Call", key="analyze_call_button"):
                     if call_transcript and call_first_name and call_last_name:
                         with st.spinner("Analyzing the call transcript..."):
-                            role_info = STAFF_ROLES[call_role]
-                            analysis_prompt = f"""
-                            **System Grounding:** You are an expert training assistant for the University of North Dakota Housing & Residence Life, specializing in the Guiding NORTH Framework. Your analysis MUST be based *strictly* on the following framework document:
-
-                            ---
-                            {GUIDING_NORTH_FRAMEWORK}
-                            ---
-
-                            **Operational Knowledge Base (protocols, policies & supervisor-approved exemplary standards):**
-                            ---
-                            {load_knowledge_base()}
-                            {retrieve_sop_context((call_role + ' ' + call_transcript)[:600])}
-                            {get_fees_block()}
-                            ---
-
-                            **UND Housing Website Notes (public info & links):**
-                            ---
-                            {UND_WEBSITE_KB}
-                            ---
-
-                            **Best Practices (on‑campus housing):**
-                            ---
-                            {HOUSING_BEST_PRACTICES}
-                            ---
-
-                            **Organizational Structure:**
-                            ---
-                            The '{call_role}' reports to: {role_info.get('supervisor', 'Not specified')}
-                            
-                            Organizational Chart Reporting Relationships:
-                            {chr(10).join([f"- {edge['source']} reports to {edge['target']}" for edge in ORG_CHART.get('edges', [])])}
-                            ---
-
-                            **Role Description/Job Details:**
-                            ---
-                            {role_info.get('description', 'Not provided.')}
-                            ---
-
-                            **Context for Evaluation:**
-                            - **Role:** {call_role}
-                            - **Staff Member:** {call_first_name} {call_last_name}
-                            - **Call Transcript:** {call_transcript}
-
-                            **Task:** Evaluate the staff member's phone call performance using the 'Evaluation Rubric' from the framework document.
-                            1. Provide an 'Overall Score' from 1 (Needs Improvement) to 4 (Exemplary).
-                            2. For each of the five pillars (N, O, R, T, H), assign a rating (Needs Development, Proficient, or Exemplary) and provide a brief justification for your rating, citing specific examples from the call transcript.
-                            3. If any Relevant SOP Procedures were provided above, cite the Document ID(s) (format: HRL-XXX-XX) of any sections you relied on in your evaluation.
-                            4. Provide specific suggestions for improvement where applicable.
-                            5. Conclude with a full, detailed 'Exemplary Call Example' that demonstrates how a top-performing staff member would have handled the call from start to finish.
-
-                            **Output Format (Strict):**
-                            ### Call Transcript:
-                            [Full transcript of the call]
-
-                            ---
-
-                            ### Guiding NORTH Evaluation:
-
-                            OVERALL_SCORE: [Your 1-4 Rating]
-
-                            **Overall Score:** [Your 1-4 Rating]
-
-                            ---
-
-                            **N - Navigate Needs:**
-                            - **Rating:** [Your Rating]
-                            - **Justification:** [Your Justification]
-
-                            **O - Own the Outcome:**
-                            - **Rating:** [Your Rating]
-                            - **Justification:** [Your Justification]
-
-                            **R - Respect & Relationships:**
-                            - **Rating:** [Your Rating]
-                            - **Justification:** [Your Justification]
-
-                            **T - Trust Through Transparency:**
-                            - **Rating:** [Your Rating]
-                            - **Justification:** [Your Justification]
-
-                            **H - Hope & Healing:**
-                            - **Rating:** [Your Rating]
-                            - **Justification:** [Your Justification]
-
-                            ---
-
-                            ### Relevant SOP Citations:
-                            (list any SOP Document IDs referenced, e.g. HRL-XXX-XX, or write "None" if no SOP documents were provided)
-
-                            ---
-
-                            ### Suggestions for Improvement:
-                            [Your Suggestions]
-
-                            ---
-
-                            ### Exemplary Call Example:
-                            [Your Detailed Example]
-                            """
+                            analysis_prefix, analysis_prompt = build_call_analysis_prompt(
+                                call_role, call_first_name, call_last_name, call_transcript
+                            )
                             try:
                                 if st.session_state.get('selected_model') and st.session_state.api_configured:
-                                    analysis_response = client.models.generate_content(
-                                        model=st.session_state.selected_model,
-                                        contents=analysis_prompt,
-                                        config=types.GenerateContentConfig(
-                                            temperature=0.7,
-                                            max_output_tokens=15000
-                                        )
+                                    fitted_transcript, prompt_tokens = fit_transcript_to_budget(
+                                        client, st.session_state.selected_model,
+                                        analysis_prefix, analysis_prompt, call_transcript
                                     )
+                                    if fitted_transcript != call_transcript:
+                                        st.warning(f"Transcript too long for this model; only the first {len(fitted_transcript):,} characters will be analyzed.")
+                                        analysis_prefix, analysis_prompt = build_call_analysis_prompt(
+                                            call_role, call_first_name, call_last_name, fitted_transcript
+                                        )
                                     st.markdown("### 📊 Call Analysis Results")
-                                    st.markdown(analysis_response.text)
+                                    analysis_placeholder = st.empty()
+                                    analysis_text = cached_call_analysis(
+                                        (st.session_state.selected_model, analysis_prefix, analysis_prompt),
+                                        lambda: stream_markdown(generate_with_prompt_cache(
+                                            client,
+                                            st.session_state.selected_model,
+                                            analysis_prefix,
+                                            analysis_prompt,
+                                            config=types.GenerateContentConfig(
+                                                temperature=0.7,
+                                                max_output_tokens=15000
+                                            ),
+                                            stream=True
+                                        ), analysis_placeholder)
+                                    )
+                                    analysis_placeholder.markdown(analysis_text)
                                     
                                     # Extract overall score
-                                    overall_score = "Not Found"
-                                    for line in analysis_response.text.splitlines():
-                                        if "Overall Score:" in line:
-                                            try:
-                                                overall_score = line.split(":")[1].strip()
-                                            except IndexError:
-                                                overall_score = "Parse Error"
-                                            break
+                                    m = _CALL_SCORE_RE.search(analysis_text)
+                                    overall_score = m.group(1).strip() if m else "Not Found"
 
                                     # Inline print button
                                     _call_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -2419,8 +3111,8 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                                         "submitted_date": _call_ts,
                                         "scenario": f"Phone Call Transcript (Length: {len(call_transcript)} chars)",
                                         "staff_response": call_transcript,
-                                        "ai_analysis": analysis_response.text,
-                                        "exemplary_response": extract_exemplary_response(analysis_response.text),
+                                        "ai_analysis": analysis_text,
+                                        "exemplary_response": extract_exemplary_response(analysis_text),
                                         "overall_score": overall_score,
                                     })
                                     st.download_button(
@@ -2441,15 +3133,16 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                                         "difficulty": "Call Analysis",
                                         "scenario": f"Phone Call Transcript (Length: {len(call_transcript)} chars)",
                                         "user_response": call_transcript,
-                                        "evaluation": analysis_response.text,
+                                        "evaluation": analysis_text,
                                         "overall_score": overall_score,
                                         "status": "pending",
-                                        "exemplary_response": extract_exemplary_response(analysis_response.text),
+                                        "exemplary_response": extract_exemplary_response(analysis_text),
+                                        "prompt_tokens": prompt_tokens,
                                     }
-                                    if save_results(new_result):
-                                        st.success("Call analysis saved — pending supervisor review.")
-                                    else:
-                                        st.error("Failed to save the analysis.")
+                                    # The insert runs off the script thread; each submission keeps its own future so
+                                    # every failure is reported on a later rerun
+                                    st.session_state.setdefault("_pending_call_saves", []).append(save_results_in_background(new_result))
+                                    st.success("Call analysis complete — saving for supervisor review in the background.")
                                 else:
                                     st.error("API is not configured. Please initialize it in the sidebar.")
                             except Exception as e:
@@ -2477,138 +3170,36 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                             with st.spinner("Processing audio and analyzing call..."):
                                 try:
                                     # Prepare audio part with explicit mime type
-                                    import mimetypes
                                     audio_bytes = uploaded_audio.getvalue()
-                                    mime_type = uploaded_audio.type or mimetypes.guess_type(uploaded_audio.name)[0] or "audio/mpeg"
                                     audio_part = types.Part.from_bytes(
                                         data=audio_bytes,
-                                        mime_type=mime_type
+                                        mime_type=audio_mime_type(uploaded_audio)
                                     )
                                     
-                                    role_info = STAFF_ROLES.get(call_role, {})
-                                    analysis_prompt = f"""
-                                    **System Grounding:** You are an expert training assistant for the University of North Dakota Housing & Residence Life, specializing in the Guiding NORTH Framework. Your analysis MUST be based *strictly* on the following framework document:
-
-                                    ---
-                                    {GUIDING_NORTH_FRAMEWORK}
-                                    ---
-
-                                    **Operational Knowledge Base (protocols, policies & supervisor-approved exemplary standards):**
-                                    ---
-                                    {load_knowledge_base()}
-                                    {retrieve_sop_context(call_role)}
-                                    {get_fees_block()}
-                                    ---
-
-                                    **UND Housing Website Notes (public info & links):**
-                                    ---
-                                    {UND_WEBSITE_KB}
-                                    ---
-
-                                    **Best Practices (on‑campus housing):**
-                                    ---
-                                    {HOUSING_BEST_PRACTICES}
-                                    ---
-
-                                    **Organizational Structure:**
-                                    ---
-                                    The '{call_role}' reports to: {role_info.get('supervisor', 'Not specified')}
-                                    
-                                    Organizational Chart Reporting Relationships:
-                                    {chr(10).join([f"- {edge['source']} reports to {edge['target']}" for edge in ORG_CHART.get('edges', [])])}
-                                    ---
-
-                                    **Role Description/Job Details:**
-                                    ---
-                                    {role_info.get('description', 'Not provided.')}
-                                    ---
-
-                                    **Context for Evaluation:**
-                                    - **Role:** {call_role}
-                                    - **Staff Member:** {call_first_name} {call_last_name}
-                                    - **Audio:** Please transcribe and analyze the audio recording provided.
-
-                                    **Task:** 
-                                    1. First, provide a complete transcript of the phone call.
-                                    2. Then, evaluate the staff member's phone call performance using the 'Evaluation Rubric' from the framework document.
-                                    3. Provide an 'Overall Score' from 1 (Needs Improvement) to 4 (Exemplary).
-                                    4. For each of the five pillars (N, O, R, T, H), assign a rating (Needs Development, Proficient, or Exemplary) and provide a brief justification for your rating, citing specific examples from the call.
-                                    5. If any Relevant SOP Procedures were provided above, cite the Document ID(s) (format: HRL-XXX-XX) of any sections you relied on in your evaluation.
-                                    6. Provide specific suggestions for improvement where applicable.
-                                    7. Conclude with a full, detailed 'Exemplary Call Example' that demonstrates how a top-performing staff member would have handled the call from start to finish.
-
-                                    **Output Format (Strict):**
-                                    ### Call Transcript:
-                                    [Full transcript of the call]
-
-                                    ---
-
-                                    ### Guiding NORTH Evaluation:
-
-                                    OVERALL_SCORE: [Your 1-4 Rating]
-
-                                    **Overall Score:** [Your 1-4 Rating]
-
-                                    ---
-
-                                    **N - Navigate Needs:**
-                                    - **Rating:** [Your Rating]
-                                    - **Justification:** [Your Justification]
-
-                                    **O - Own the Outcome:**
-                                    - **Rating:** [Your Rating]
-                                    - **Justification:** [Your Justification]
-
-                                    **R - Respect & Relationships:**
-                                    - **Rating:** [Your Rating]
-                                    - **Justification:** [Your Justification]
-
-                                    **T - Trust Through Transparency:**
-                                    - **Rating:** [Your Rating]
-                                    - **Justification:** [Your Justification]
-
-                                    **H - Hope & Healing:**
-                                    - **Rating:** [Your Rating]
-                                    - **Justification:** [Your Justification]
-
-                                    ---
-
-                                    ### Relevant SOP Citations:
-                                    (list any SOP Document IDs referenced, e.g. HRL-XXX-XX, or write "None" if no SOP documents were provided)
-
-                                    ---
-
-                                    ### Suggestions for Improvement:
-                                    [Your Suggestions]
-
-                                    ---
-
-                                    ### Exemplary Call Example:
-                                    [Your Detailed Example]
-                                    """
+                                    analysis_prefix, analysis_prompt = build_call_analysis_prompt(
+                                        call_role, call_first_name, call_last_name
+                                    )
                                     
                                     if st.session_state.api_configured:
-                                        analysis_response = client.models.generate_content(
-                                            model=st.session_state.selected_model,
-                                            contents=[audio_part, analysis_prompt],
-                                            config=types.GenerateContentConfig(
-                                                temperature=0.7,
-                                                max_output_tokens=15000
-                                            )
-                                        )
-                                        
                                         st.markdown("### 📊 Call Analysis Results")
-                                        st.markdown(analysis_response.text)
+                                        analysis_placeholder = st.empty()
+                                        analysis_text = cached_call_analysis(
+                                            (st.session_state.selected_model, analysis_prefix, analysis_prompt, audio_bytes),
+                                            # Static prefix first so repeated calls share a byte-identical prompt head
+                                            lambda: stream_markdown(client.models.generate_content_stream(
+                                                model=st.session_state.selected_model,
+                                                contents=[analysis_prefix, audio_part, analysis_prompt],
+                                                config=types.GenerateContentConfig(
+                                                    temperature=0.7,
+                                                    max_output_tokens=15000
+                                                )
+                                            ), analysis_placeholder)
+                                        )
+                                        analysis_placeholder.markdown(analysis_text)
                                         
                                         # Extract overall score
-                                        overall_score = "Not Found"
-                                        for line in analysis_response.text.splitlines():
-                                            if "Overall Score:" in line:
-                                                try:
-                                                    overall_score = line.split(":")[1].strip()
-                                                except IndexError:
-                                                    overall_score = "Parse Error"
-                                                break
+                                        m = _CALL_SCORE_RE.search(analysis_text)
+                                        overall_score = m.group(1).strip() if m else "Not Found"
 
                                         # Inline print button
                                         _audio_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -2620,8 +3211,8 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                                             "submitted_date": _audio_ts,
                                             "scenario": f"Phone Call Recording ({uploaded_audio.name})",
                                             "staff_response": "(see AI analysis for transcript)",
-                                            "ai_analysis": analysis_response.text,
-                                            "exemplary_response": extract_exemplary_response(analysis_response.text),
+                                            "ai_analysis": analysis_text,
+                                            "exemplary_response": extract_exemplary_response(analysis_text),
                                             "overall_score": overall_score,
                                         })
                                         st.download_button(
@@ -2641,16 +3232,16 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                                             "role": call_role,
                                             "difficulty": "Call Analysis (Audio)",
                                             "scenario": f"Phone Call Recording ({uploaded_audio.name})",
-                                            "user_response": analysis_response.text[:1000],
-                                            "evaluation": analysis_response.text,
+                                            "user_response": analysis_text[:1000],
+                                            "evaluation": analysis_text,
                                             "overall_score": overall_score,
                                             "status": "pending",
-                                            "exemplary_response": extract_exemplary_response(analysis_response.text),
+                                            "exemplary_response": extract_exemplary_response(analysis_text),
                                         }
-                                        if save_results(new_result):
-                                            st.success("Call analysis saved — pending supervisor review.")
-                                        else:
-                                            st.error("Failed to save the analysis.")
+                                        # The insert runs off the script thread; each submission keeps its own future so
+                                        # every failure is reported on a later rerun
+                                        st.session_state.setdefault("_pending_call_saves", []).append(save_results_in_background(new_result))
+                                        st.success("Call analysis complete — saving for supervisor review in the background.")
                                     else:
                                         st.error("Gemini API is not configured. Please initialize it in the sidebar.")
                                     
@@ -2659,6 +3250,61 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                         else:
                             st.warning("Please provide your first and last name before analyzing the call.")
 
+                st.markdown("---")
+                st.markdown("#### 📦 Bulk Analyze")
+                st.caption("Queue several recordings as one batch job. Results arrive asynchronously (usually within minutes) and are saved as pending for supervisor review.")
+                bulk_audio = st.file_uploader(
+                    "Choose audio files",
+                    type=['mp3', 'mp4', 'mpeg', 'mpga', 'm4a', 'wav', 'webm', 'flac'],
+                    accept_multiple_files=True,
+                    key="bulk_audio_upload"
+                )
+                if bulk_audio and st.button(f"📦 Submit {len(bulk_audio)} Call(s) for Batch Analysis", key="submit_call_batch"):
+                    if not ((call_first_name or "").strip() and (call_last_name or "").strip()):
+                        st.warning("Please provide your first and last name before analyzing calls.")
+                    elif not st.session_state.api_configured:
+                        st.error("Gemini API is not configured. Please initialize it in the sidebar.")
+                    else:
+                        with st.spinner("Uploading recordings and submitting batch job..."):
+                            try:
+                                batch = submit_call_analysis_batch(
+                                    client, st.session_state.selected_model,
+                                    call_role, call_first_name, call_last_name, bulk_audio
+                                )
+                                st.session_state.setdefault("call_batches", []).append({
+                                    "name": batch.name,
+                                    "files": [f.name for f in bulk_audio],
+                                    "role": call_role,
+                                    "first_name": call_first_name,
+                                    "last_name": call_last_name,
+                                    "email": call_email,
+                                })
+                                st.success(f"Batch submitted ({len(bulk_audio)} call(s)). Check back for results.")
+                            except Exception as e:
+                                st.error(f"Error submitting batch: {e}")
+
+                call_batches = st.session_state.get("call_batches", [])
+                if call_batches:
+                    st.info(f"{len(call_batches)} batch job(s) in progress.")
+                    if st.button("🔄 Check Batch Status", key="check_call_batches"):
+                        still_running = []
+                        for job in call_batches:
+                            try:
+                                state, saved = collect_call_analysis_batch(client, job)
+                            except Exception as e:
+                                st.error(f"Error checking batch {job['name']}: {e}")
+                                still_running.append(job)
+                                continue
+                            if state is None:
+                                still_running.append(job)
+                            elif state == "JOB_STATE_SUCCEEDED":
+                                st.success(f"Saved {saved} of {len(job['files'])} call analyses — pending supervisor review.")
+                            else:
+                                st.error(f"Batch {job['name']} ended with {state}.")
+                        st.session_state.call_batches = still_running
+                        if still_running:
+                            st.caption(f"{len(still_running)} batch job(s) still running.")
+
     # Assign Scenarios Tab - For Supervisors Only
     if 'assign_scenarios_tab' in locals() and assign_scenarios_tab is not None:
         with assign_scenarios_tab:
@@ -2666,23 +3312,22 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
             st.write("Create and assign targeted training scenarios to your team members based on specific topics.")
             
             # Get supervisor's direct and indirect reports (roles)
-            def get_subordinate_roles(role_name, edges, visited=None):
+            def get_subordinate_roles(role_name, visited=None):
                 if visited is None:
                     visited = set()
                 if role_name in visited:
                     return visited
                 visited.add(role_name)
 
-                for edge in edges:
-                    if edge.get('target') == role_name:
-                        visited.update(get_subordinate_roles(edge['source'], edges, visited))
+                for source in REPORTS_BY_TARGET.get(role_name, []):
+                    get_subordinate_roles(source, visited)
                 return visited
 
             if st.session_state.get("is_admin"):
                 report_roles = list(STAFF_ROLES.keys())
             else:
                 supervisor_role = st.session_state.get("position")
-                report_roles = list(get_subordinate_roles(supervisor_role, ORG_CHART.get('edges', [])))
+                report_roles = list(get_subordinate_roles(supervisor_role))
 
             if not report_roles:
                 st.warning("You don't have any reports to assign scenarios to.")
@@ -2763,21 +3408,18 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                         with st.spinner(f"Generating {selected_difficulty} {selected_topic} scenario for {len(selected_staff)} staff member(s)..."):
                             try:
                                 # Use the shared scenario prompt builder (same logic as self-practice generator)
-                                scenario_prompt = build_scenario_prompt(
+                                scenario_prefix, scenario_prompt = build_scenario_prompt_parts(
                                     role_name=selected_role,
                                     difficulty=selected_difficulty,
                                     topic=selected_topic
                                 )
 
-                                # Call Gemini API (use configured client)
-                                client = st.session_state.get('genai_client')
-                                if not client:
-                                    st.error("Gemini API is not configured. Please initialize it in the sidebar.")
-                                    st.stop()
-
-                                response = client.models.generate_content(
-                                    model=st.session_state.get("selected_model", "models/gemini-1.5-flash"),
-                                    contents=scenario_prompt
+                                # Reuse the page-level client (shared per API key via get_genai_client)
+                                response = generate_with_prompt_cache(
+                                    client,
+                                    st.session_state.get("selected_model", "models/gemini-1.5-flash"),
+                                    scenario_prefix,
+                                    scenario_prompt
                                 )
                                 
                                 generated_scenario = response.text if response.text else "Unable to generate scenario"
@@ -2856,11 +3498,10 @@ if st.session_state.get("email") and st.session_state.get("api_configured"):
                     ORG_CHART
                 )
             
-            # Load results and filter for pending
-            all_results = load_results()
+            # Load only pending results; the status filter runs in the database
             pending_results = [
-                (idx, r) for idx, r in enumerate(all_results) 
-                if r.get('status') == 'pending' and r.get('email') in visible_users
+                (idx, r) for idx, r in enumerate(load_results(status='pending'))
+                if r.get('email') in visible_users
             ]
 
             # Load assigned scenarios — split by status
@@ -3346,7 +3987,6 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
             ]
         }
         
-        import pandas as pd
         df = pd.DataFrame(rubric_data)
         st.dataframe(df, use_container_width=True, hide_index=True)
         
@@ -3390,12 +4030,11 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
         chart_width = st.slider("Chart Width (px)", min_value=600, max_value=1800, value=1200, step=50)
         chart_height = st.slider("Chart Height (px)", min_value=400, max_value=1400, value=700, step=50)
 
-        # Reload latest config for org chart display
-        latest_config = load_config()
-        display_org_chart = latest_config.get('org_chart', {'nodes': [], 'edges': []})
-        display_staff_roles = latest_config.get('staff_roles', {})
+        # The config loaded at the top of this run is current (save_config clears the cache and reruns)
+        display_org_chart = dict(ORG_CHART)
+        display_staff_roles = STAFF_ROLES
         
-        # Update nodes from staff roles (but DON'T save automatically)
+        # Nodes are derived from staff roles for display only; nothing is saved from this render path
         display_org_chart['nodes'] = list(display_staff_roles.keys())
 
         # Build role -> names mapping (supports multiple people per role)
@@ -3413,7 +4052,7 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
         if not display_org_chart['nodes']:
             st.warning("No staff roles defined. Please add roles in the Configuration tab.")
         else:
-            nodes = []
+            node_labels = []
             for role in display_org_chart['nodes']:
                 names = role_to_names.get(role, [])
                 if names:
@@ -3421,8 +4060,11 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
                     label = f"{role}\n" + "\n".join(names_sorted)
                 else:
                     label = role
-                nodes.append(Node(id=role, label=label, size=25))
-            edges = [Edge(source=edge['source'], target=edge['target'], label="reports to") for edge in display_org_chart.get('edges', [])]
+                node_labels.append((role, label))
+            nodes, edges = build_org_chart_elements(
+                tuple(node_labels),
+                tuple((edge['source'], edge['target']) for edge in display_org_chart.get('edges', []))
+            )
             
             agraph_config = Config(
                 width=chart_width, 
@@ -3536,14 +4178,18 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
                 if not current_org_chart.get('edges'):
                     st.info("No reporting relationships defined yet.")
                 else:
-                    for i, edge in enumerate(list(current_org_chart['edges'])):
+                    org_edges = current_org_chart['edges']
+                    # No copy needed: the loop stops as soon as an edge is removed, whether or not the save succeeds
+                    for i in range(len(org_edges)):
+                        edge = org_edges[i]
                         st.markdown(f"- **{edge['source']}** reports to **{edge['target']}**")
                         if st.button(f"Remove", key=f"remove_edge_{i}"):
-                            current_org_chart['edges'].pop(i)
+                            org_edges.pop(i)
                             current_config['org_chart'] = current_org_chart
                             if save_config(current_config):
                                 st.success("Relationship removed.")
                                 st.rerun()
+                            break
 
             # Role Detail Management
             st.subheader("Manage Role Details")
@@ -3567,7 +4213,11 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
                             key=f"pdf_{role_name}"
                         )
 
-                        if uploaded_file is not None:
+                        # The uploader keeps its file across reruns, so only save each upload once per role
+                        processed_jd_uploads = st.session_state.setdefault("_processed_jd_uploads", {})
+                        upload_id = getattr(uploaded_file, "file_id", None) or getattr(uploaded_file, "name", None)
+                        if uploaded_file is not None and processed_jd_uploads.get(role_name) != upload_id:
+                            processed_jd_uploads[role_name] = upload_id
                             pdf_text = extract_text_from_pdf(uploaded_file)
                             if pdf_text:
                                 STAFF_ROLES[role_name]['description'] = pdf_text
@@ -3797,8 +4447,7 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
                             st.success("✅ Knowledge Base saved to database successfully!")
                         # Also write to file as local backup
                         try:
-                            with open(KNOWLEDGE_BASE_FILE, 'w', encoding='utf-8') as f:
-                                f.write(edited_kb)
+                            _atomic_write_text(KNOWLEDGE_BASE_FILE, edited_kb)
                         except Exception:
                             pass
                 with kb_col2:
@@ -3844,7 +4493,22 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
         st.header("Results & Progress")
         st.write("Review past performance and track development.")
 
-        results_data = load_results()
+        results_limit = st.number_input(
+            "Most recent results to load",
+            min_value=50, max_value=5000, value=RESULTS_DEFAULT_LIMIT, step=50,
+            key="results_load_limit",
+            help="Only the newest results you can view are fetched; raise this to include older history in the analytics below."
+        )
+        # Scope the query to this viewer before the limit is applied
+        if st.session_state.get('is_admin'):
+            results_scope = {}
+        elif st.session_state.get('user_role') == 'supervisor':
+            results_scope = {"viewer_email": st.session_state.email, "report_roles": st.session_state.get('direct_reports', [])}
+        else:
+            results_scope = {"viewer_email": st.session_state.email}
+        results_data = load_results(limit=int(results_limit), completed_only=True, **results_scope)
+        if len(results_data) >= results_limit:
+            st.caption(f"Showing the {len(results_data)} most recent results you can view; raise the limit above to include older history.")
 
         def is_valid_score(value):
             score_str = str(value).strip()
@@ -3861,7 +4525,7 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
                 "exemplary": "4"
             }
 
-            explicit_match = re.search(r"^OVERALL_SCORE\s*:\s*([1-4])\b", text, flags=re.MULTILINE)
+            explicit_match = _OVERALL_SCORE_LINE_RE.search(text)
             if explicit_match:
                 return explicit_match.group(1)
 
@@ -3978,7 +4642,7 @@ Provide structured feedback on each NORTH pillar and an overall score (1-4)."""
             with st.expander("Admin Tools"):
                 if st.button("Retro-fix stored analysis scores", key="retro_fix_scores"):
                     updated_results = 0
-                    for res in results_data:
+                    for res in load_results():
                         evaluation_text = res.get("evaluation", "")
                         parsed_score = parse_overall_score(evaluation_text)
                         if parsed_score and (not is_valid_score(res.get("overall_score")) or res.get("overall_score") != parsed_score):
@@ -4058,10 +4722,7 @@ OVERALL_SCORE: [Your 1-4 Rating]
                 )
 
                 if st.button("Rerun Selected Analyses", key="rerun_selected_analyses"):
-                    client = st.session_state.get('genai_client')
-                    if not client:
-                        st.error("No API client available. Please enter an API key and login.")
-                    elif not selected_to_rerun:
+                    if not selected_to_rerun:
                         st.warning("Select at least one analysis to rerun.")
                     else:
                         updated_results = 0
@@ -4155,60 +4816,60 @@ OVERALL_SCORE: [Your 1-4 Rating]
             # Filter results based on user role and access permissions
             if st.session_state.get('is_admin'):
                 # Admin sees: ALL completed scores
-                filtered_results = completed_results
+                access = "admin"
                 st.info(f"📊 Admin view: Viewing all completed results from all users ({len(completed_results)} total).")
             elif st.session_state.get('user_role') == 'supervisor':
                 # Supervisor sees: their own scores + all direct reports' scores (completed only)
-                allowed_emails = [st.session_state.email] + [
-                    res.get('email') for res in completed_results 
-                    if res.get('role') in st.session_state.direct_reports
-                ]
-                filtered_results = [res for res in completed_results if res.get('email') in allowed_emails]
+                access = "supervisor"
                 st.info(f"📊 You are viewing your results and your {len(st.session_state.direct_reports)} direct report role(s).")
             else:
                 # Staff sees: only their own completed scores
-                filtered_results = [res for res in completed_results if res.get('email') == st.session_state.email]
+                access = "staff"
                 st.info(f"📊 You are viewing your own results only.")
+            # Cached, so widget reruns reuse the filter and role split
+            partition = partition_results(
+                tuple(res.get('email') for res in completed_results),
+                tuple(res.get('role') for res in completed_results),
+                st.session_state.email,
+                tuple(st.session_state.get('direct_reports', [])) if access == "supervisor" else (),
+                access,
+            )
+            filtered_results = [completed_results[i] for i in partition["all"]]
             
             if not filtered_results:
                 st.warning("No results found for your access level.")
             else:
-                # Get unique roles from filtered results
-                all_roles = sorted(list(set(res.get("role", "Unknown") for res in filtered_results if res.get("role"))))
+                all_roles = partition["roles"]
                 
-                # Create tabs for each role
-                role_tabs = st.tabs(["All Roles"] + all_roles)
+                # A selector rather than st.tabs: tabs run every body on each rerun, this renders only the chosen role
+                role_options = ["All Roles"] + all_roles
+                if st.session_state.get("active_role") not in role_options:
+                    st.session_state.active_role = "All Roles"
+                active_role = st.radio("Role:", role_options, horizontal=True, key="active_role")
                 
-                # Function to display role analytics
+                # Displays one role's analytics as a fragment: the user filter, pagination and per-result
+                # widgets rerun only this body, not the results load and partition above.
+                @st.fragment
                 def display_role_analytics(role_results, role_name="All Users"):
                     if not role_results:
                         st.info(f"No results found for {role_name}.")
                         return
                     
-                    # Extract all scores for this role group
-                    all_role_scores = []
-                    for res in role_results:
-                        score_str = str(res.get("overall_score", "0")).strip()
-                        if score_str.isdigit():
-                            all_role_scores.append(int(score_str))
-                        else:
-                            first_digit = next((char for char in score_str if char.isdigit()), None)
-                            if first_digit:
-                                all_role_scores.append(int(first_digit))
-                    
-                    # Calculate role group average
-                    role_group_avg = (sum(all_role_scores) / len(all_role_scores)) if all_role_scores else 0
+                    # Role group aggregates (cached per result set)
+                    group_stats = compute_role_analytics(analytics_fingerprint(role_results))
+                    role_group_avg = group_stats["avg"]
                     
                     # Filter by individual user (using email as unique identifier)
-                    all_users_in_role = []
+                    # setdefault on a dict dedupes in one pass; only the distinct users are sorted
+                    users_seen = {}
                     for res in role_results:
                         if "email" in res:
                             full_name = f"{res.get('first_name', '')} {res.get('last_name', '')} ({res['email']})"
-                            all_users_in_role.append((res['email'], full_name))
+                            users_seen.setdefault((res['email'], full_name), None)
                         elif "user_name" in res:
-                            all_users_in_role.append((res['user_name'], res['user_name']))
+                            users_seen.setdefault((res['user_name'], res['user_name']), None)
                     
-                    all_users_in_role = sorted(list(set(all_users_in_role)), key=lambda x: x[1])
+                    all_users_in_role = sorted(users_seen, key=lambda x: x[1])
                     user_display_names = ["All Users in Role"] + [name for _, name in all_users_in_role]
                     user_emails = ["All Users in Role"] + [email for email, _ in all_users_in_role]
                     
@@ -4227,31 +4888,23 @@ OVERALL_SCORE: [Your 1-4 Rating]
 
                     # Display summary statistics
                     if filtered_role_results:
-                        scores = []
-                        for res in filtered_role_results:
-                            score_str = str(res.get("overall_score", "0")).strip()
-                            if score_str.isdigit():
-                                scores.append(int(score_str))
-                            else:
-                                first_digit = next((char for char in score_str if char.isdigit()), None)
-                                if first_digit:
-                                    scores.append(int(first_digit))
+                        # Group view shows the same slice as the role aggregates, so reuse them rather than re-fingerprinting
+                        stats = group_stats if is_group_view else compute_role_analytics(analytics_fingerprint(filtered_role_results))
+                        scores = stats["scores"]
                         
                         # Display metrics with role comparison
                         col1, col2, col3, col4 = st.columns(4)
                         
                         with col1:
                             if scores:
-                                avg_score = sum(scores) / len(scores)
-                                st.metric(label="Your Average Score", value=f"{avg_score:.2f} / 4")
+                                st.metric(label="Your Average Score", value=f"{stats['avg']:.2f} / 4")
                             else:
                                 st.metric(label="Your Average Score", value="N/A")
                         
                         with col2:
                             if not is_group_view:
                                 # Show comparison to role group (individual avg - group avg)
-                                user_avg = sum(scores) / len(scores) if scores else 0
-                                comparison = user_avg - role_group_avg
+                                comparison = stats["avg"] - role_group_avg
                                 st.metric(label="vs Role Group Average", value=f"{role_group_avg:.2f} / 4",
                                         delta=f"{comparison:+.2f}" if comparison != 0 else "Same",
                                         delta_color="normal")
@@ -4262,11 +4915,8 @@ OVERALL_SCORE: [Your 1-4 Rating]
                             st.metric(label="Total Scenarios Completed", value=len(filtered_role_results))
                         
                         with col4:
-                            if len(scores) >= 2:
-                                midpoint = len(scores) // 2
-                                first_half_avg = sum(scores[:midpoint]) / midpoint if midpoint > 0 else 0
-                                second_half_avg = sum(scores[midpoint:]) / (len(scores) - midpoint)
-                                improvement = second_half_avg - first_half_avg
+                            improvement = stats["improvement"]
+                            if improvement is not None:
                                 st.metric(label="Improvement Trend", value=f"{improvement:+.2f}", 
                                          delta=f"{improvement:+.2f} points",
                                          delta_color="normal" if improvement >= 0 else "inverse")
@@ -4277,178 +4927,106 @@ OVERALL_SCORE: [Your 1-4 Rating]
                         st.markdown("---")
                         st.subheader("Score Progression Over Time")
                         
-                        # Prepare data for chart
-                        chart_data = []
-                        for idx, res in enumerate(filtered_role_results):
-                            score_str = str(res.get("overall_score", "0")).strip()
-                            score = None
-                            if score_str.isdigit():
-                                score = int(score_str)
-                            else:
-                                first_digit = next((char for char in score_str if char.isdigit()), None)
-                                if first_digit:
-                                    score = int(first_digit)
-                            
-                            if score:
-                                chart_data.append({
-                                    "attempt": idx + 1,
-                                    "score": score,
-                                    "date": res.get("timestamp", "N/A")[:10],
-                                    "difficulty": res.get("difficulty", "N/A")
-                                })
-                        
+                        chart_data = stats["chart_data"]
                         if chart_data:
-                            # Create plotly figure with trendline
-                            fig = go.Figure()
-                            
-                            attempts = [d["attempt"] for d in chart_data]
-                            scores_plot = [d["score"] for d in chart_data]
-                            dates = [d["date"] for d in chart_data]
-                            
-                            # Add scatter plot
-                            fig.add_trace(go.Scatter(
-                                x=attempts,
-                                y=scores_plot,
-                                mode='lines+markers',
-                                name='Score',
-                                line=dict(color='#1f77b4', width=2),
-                                marker=dict(size=8)
-                            ))
-                            
-                            # Add trendline
-                            z = np.polyfit(attempts, scores_plot, 1)
-                            p = np.poly1d(z)
-                            trendline = p(np.array(attempts))
-                            
-                            fig.add_trace(go.Scatter(
-                                x=attempts,
-                                y=trendline,
-                                mode='lines',
-                                name='Trend',
-                                line=dict(color='red', width=2, dash='dash')
-                            ))
-                            
-                            fig.update_layout(
-                                title="Score Progression with Trendline",
-                                xaxis_title="Attempt Number",
-                                yaxis_title="Score (out of 4)",
-                                hovermode='x unified',
-                                height=400,
-                                yaxis=dict(range=[0, 4])
+                            # Built once per distinct series; reruns reuse the cached Figure
+                            fig = build_progression_figure(
+                                tuple(d["attempt"] for d in chart_data),
+                                tuple(d["score"] for d in chart_data),
+                                tuple(stats["rolling_avg"]),
+                                tuple(stats["trendline"]),
                             )
-                            
                             st.plotly_chart(fig, use_container_width=True, key=f"score_progression_{role_name}")
 
                         # Categorize scores by difficulty
                         st.markdown("---")
                         st.subheader("Performance by Difficulty Level")
                         
-                        difficulty_scores = {}
-                        for res in filtered_role_results:
-                            difficulty = res.get("difficulty", "N/A")
-                            score_str = str(res.get("overall_score", "0")).strip()
-                            score = None
-                            if score_str.isdigit():
-                                score = int(score_str)
-                            else:
-                                first_digit = next((char for char in score_str if char.isdigit()), None)
-                                if first_digit:
-                                    score = int(first_digit)
-                            
-                            if score:
-                                if difficulty not in difficulty_scores:
-                                    difficulty_scores[difficulty] = []
-                                difficulty_scores[difficulty].append(score)
+                        difficulty_summary = stats["difficulty_summary"]
                         
                         # Display metrics for each difficulty
-                        if difficulty_scores:
-                            diff_cols = st.columns(len(difficulty_scores))
-                            for col_idx, (difficulty, scores_by_diff) in enumerate(sorted(difficulty_scores.items())):
+                        if difficulty_summary:
+                            diff_cols = st.columns(len(difficulty_summary))
+                            for col_idx, (difficulty, avg, attempts) in enumerate(difficulty_summary):
                                 with diff_cols[col_idx]:
-                                    avg = sum(scores_by_diff) / len(scores_by_diff)
                                     st.metric(
                                         label=f"{difficulty}",
                                         value=f"{avg:.2f} / 4",
-                                        delta=f"({len(scores_by_diff)} attempts)"
+                                        delta=f"({attempts} attempts)"
                                     )
                         
                         # Create comparison chart by difficulty
-                        if difficulty_scores:
+                        if difficulty_summary:
                             st.markdown("---")
                             st.subheader("Average Score by Difficulty")
                             
-                            difficulties = sorted(difficulty_scores.keys())
-                            averages = [sum(difficulty_scores[d]) / len(difficulty_scores[d]) for d in difficulties]
-                            
-                            fig_bar = go.Figure(data=[
-                                go.Bar(
-                                    x=difficulties,
-                                    y=averages,
-                                    marker=dict(color=['#ff7f0e', '#2ca02c', '#d62728']),
-                                    text=[f"{avg:.2f}" for avg in averages],
-                                    textposition='outside'
-                                )
-                            ])
-                            
-                            fig_bar.update_layout(
-                                title="Average Score by Difficulty Level",
-                                xaxis_title="Difficulty",
-                                yaxis_title="Average Score",
-                                height=400,
-                                yaxis=dict(range=[0, 4])
+                            # A few bars need no Plotly figure; st.bar_chart sends a small Vega-Lite spec
+                            st.bar_chart(
+                                pd.DataFrame(
+                                    {"Average Score": [avg for _, avg, _ in difficulty_summary]},
+                                    index=[str(difficulty) for difficulty, _, _ in difficulty_summary],
+                                ),
+                                use_container_width=True
                             )
-                            
-                            st.plotly_chart(fig_bar, use_container_width=True, key=f"difficulty_bar_{role_name}")
 
                         # Create a simplified display table
-                        display_data = []
-                        for res in filtered_role_results:
-                            display_row = {
-                                "Date": res.get("timestamp", "N/A")[:10],
-                                "Name": f"{res.get('first_name', '')} {res.get('last_name', '')}" if "first_name" in res else res.get("user_name", "N/A"),
-                                "Role": res.get("role", "N/A"),
-                                "Difficulty": res.get("difficulty", "N/A"),
-                                "Score": res.get("overall_score", "N/A")
-                            }
-                            display_data.append(display_row)
-                        
-                        st.dataframe(display_data, use_container_width=True)
-
-                        # Expander to view full details
-                        for i, result in enumerate(reversed(filtered_role_results)):
-                            user_display = f"{result.get('first_name', '')} {result.get('last_name', '')}" if "first_name" in result else result.get("user_name", "N/A")
-                            difficulty_display = result.get("difficulty", "N/A")
-                            with st.expander(f"{result.get('timestamp', 'N/A')[:16]} - {result.get('role', 'N/A')} ({difficulty_display}) - Score: {result.get('overall_score', 'N/A')}"):
-                                st.markdown(f"**User:** {user_display}")
-                                st.markdown(f"**Email:** {result.get('email', 'N/A')}")
-                                st.markdown(f"**Difficulty:** {difficulty_display}")
-                                st.markdown(f"**Submitted:** {result.get('timestamp', 'N/A')}")
+                        st.dataframe(results_display_frame(filtered_role_results), use_container_width=True)
+
+                        # Format each distinct review date once for the whole list rather than per expander
+                        review_dates = {
+                            d: format_review_date(d)
+                            for d in {res.get('review_date') for res in filtered_role_results}
+                            if d and d != 'N/A'
+                        }
+
+                        # Expander to view full details, one page at a time (newest first, as load_results returns them)
+                        page_key = f"review_page_{role_name}"
+                        page_count = max(1, -(-len(filtered_role_results) // REVIEW_PAGE_SIZE))
+                        page = min(st.session_state.get(page_key, 0), page_count - 1)
+                        if page_count > 1:
+                            prev_col, info_col, next_col = st.columns([1, 3, 1])
+                            if prev_col.button("◀ Prev", key=f"{page_key}_prev", disabled=page == 0):
+                                st.session_state[page_key] = page - 1
+                                st.rerun(scope="fragment")
+                            info_col.caption(f"Page {page + 1} of {page_count} ({len(filtered_role_results)} results)")
+                            if next_col.button("Next ▶", key=f"{page_key}_next", disabled=page >= page_count - 1):
+                                st.session_state[page_key] = page + 1
+                                st.rerun(scope="fragment")
+                        lo = page * REVIEW_PAGE_SIZE
+                        page_results = filtered_role_results[lo:lo + REVIEW_PAGE_SIZE]
+                        for i, result in enumerate(page_results, start=lo):
+                            # Bind each row's fields once; the header, key and delete paths reuse them
+                            get = result.get
+                            timestamp, email, assignment_id = get('timestamp', 'N/A'), get('email', 'N/A'), get('assignment_id')
+                            user_display = f"{get('first_name', '')} {get('last_name', '')}" if "first_name" in result else get("user_name", "N/A")
+                            difficulty_display = get("difficulty", "N/A")
+                            with st.expander(f"{timestamp[:16]} - {get('role', 'N/A')} ({difficulty_display}) - Score: {get('overall_score', 'N/A')}"):
+                                st.markdown(
+                                    f"**User:** {user_display}\n\n"
+                                    f"**Email:** {email}\n\n"
+                                    f"**Difficulty:** {difficulty_display}\n\n"
+                                    f"**Submitted:** {timestamp}"
+                                )
 
                                 if st.session_state.get('is_admin'):
                                     st.markdown("---")
-                                    delete_key = (
-                                        f"delete_result_{role_name}_"
-                                        f"{i}_"
-                                        f"{result.get('_result_index', 'na')}_"
-                                        f"{result.get('assignment_id', 'na')}_"
-                                        f"{result.get('timestamp', 'na')}_"
-                                        f"{result.get('email', 'na')}"
-                                    )
+                                    # hash() is stable within the server process, which is all a widget key needs
+                                    delete_key = f"del_{role_name}_{i}_{hash((get('_result_index'), assignment_id, get('timestamp'), get('email')))}"
                                     if st.button("Delete Result", key=delete_key):
-                                        if result.get("is_assigned") and result.get("assignment_id"):
-                                            if delete_assignment(result.get("assignment_id")):
+                                        if get("is_assigned") and assignment_id:
+                                            if delete_assignment(assignment_id):
                                                 st.success("Result deleted.")
                                                 st.rerun()
                                         else:
-                                            if result.get('id'):
-                                                delete_result(result.get('id'))
+                                            if get('id'):
+                                                delete_result(get('id'))
                                             else:
                                                 # Fallback: match by email+timestamp
                                                 results_data_updated = load_results()
                                                 matched = next(
                                                     (r for r in results_data_updated
-                                                     if r.get('email') == result.get('email')
-                                                     and r.get('timestamp') == result.get('timestamp')),
+                                                     if r.get('email') == get('email')
+                                                     and r.get('timestamp') == get('timestamp')),
                                                     None
                                                 )
                                                 if matched and matched.get('id'):
@@ -4457,36 +5035,26 @@ OVERALL_SCORE: [Your 1-4 Rating]
                                         st.success("Result deleted.")
                                         st.rerun()
                                 
-                                # Display supervisor review information if available
-                                if result.get('reviewed_by'):
-                                    st.markdown("---")
-                                    st.markdown("#### Supervisor Review")
-                                    review_date = result.get('review_date', '')
-                                    formatted_review_date = review_date
-                                    if review_date and review_date != 'N/A':
-                                        # Format the ISO timestamp for readability
-                                        try:
-                                            from datetime import datetime as dt
-                                            review_dt = dt.fromisoformat(review_date)
-                                            formatted_review_date = review_dt.strftime("%B %d, %Y at %I:%M %p")
-                                        except:
-                                            formatted_review_date = review_date
-                                    
-                                    st.success(f"✅ Reviewed by: **{result.get('reviewed_by')}**")
+                                reviewed_by, supervisor_notes, review_date = get('reviewed_by'), get('supervisor_notes'), get('review_date', '')
+                                scenario, user_response, evaluation_text = get('scenario', 'N/A'), get('user_response', 'N/A'), get('evaluation', 'N/A')
+
+                                # Display supervisor review information if available; the callouts render
+                                # their text as Markdown, so model and supervisor formatting is kept
+                                if reviewed_by:
+                                    formatted_review_date = review_dates.get(review_date, review_date)
+                                    st.markdown("---\n#### Supervisor Review")
+                                    st.success(f"✅ Reviewed by: **{reviewed_by}**")
                                     if formatted_review_date:
                                         st.success(f"📅 Review Date: **{formatted_review_date}**")
-                                    
-                                    if result.get('supervisor_notes'):
+                                    if supervisor_notes:
                                         st.markdown("**Supervisor Notes:**")
-                                        st.info(result.get('supervisor_notes'))
-                                
-                                st.markdown("---")
-                                st.markdown("#### Scenario")
-                                st.info(result.get('scenario', 'N/A'))
+                                        st.info(supervisor_notes)
+
+                                st.markdown("---\n#### Scenario")
+                                st.info(scenario)
                                 st.markdown("#### User Response")
-                                st.warning(result.get('user_response', 'N/A'))
-                                st.markdown("#### AI Evaluation")
-                                st.markdown(result.get('evaluation', 'N/A'))
+                                st.warning(user_response)
+                                st.markdown(f"#### AI Evaluation\n\n{evaluation_text}")
 
                                 # Show / edit exemplary response
                                 exemplary_to_show = result.get('exemplary_refined') or result.get('exemplary_response')
@@ -4621,14 +5189,10 @@ Output only the exemplary response text."""
                                     key=f"print_results_{role_name}_{i}_{result.get('id','')}{result.get('assignment_id','')}"
                                 )
 
-                # Display analytics for All Roles tab
-                with role_tabs[0]:
+                if active_role == "All Roles":
                     display_role_analytics(filtered_results, "All Roles")
-                
-                # Display analytics for each role-specific tab
-                for idx, role in enumerate(all_roles):
-                    with role_tabs[idx + 1]:
-                        role_filtered = [res for res in filtered_results if res.get("role") == role]
-                        display_role_analytics(role_filtered, role)
+                else:
+                    role_filtered = [completed_results[i] for i in partition["by_role"].get(active_role, ())]
+                    display_role_analytics(role_filtered, active_role)
 else:
     st.info("Please enter your first name, last name, and email in the sidebar, provide an API key, and click 'Login' to use the application.")